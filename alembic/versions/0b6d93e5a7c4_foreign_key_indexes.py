@@ -0,0 +1,44 @@
+"""foreign key indexes
+
+Revision ID: 0b6d93e5a7c4
+Revises: f4b7a2c9e813
+Create Date: 2025-06-23 10:17:45.602381
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0b6d93e5a7c4"
+down_revision: Union[str, None] = "f4b7a2c9e813"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    # Category subtrees, recursive CTE and depth trigger.
+    "idx_category_parent_id ON category (parent_id)",
+    # Organizations of categories, the primary key starts with org_id. With
+    # org_id included the semi-join is answered from the index alone.
+    "idx_organization_category_cat_id ON organization_category (cat_id, org_id)",
+    "idx_organization_address_id ON organization (address_id)",
+    "idx_phone_number_org_id ON phone_number (org_id)",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY does not block writes, but cannot run in a transaction.
+    # An interrupted build leaves an invalid index behind, drop it and rerun.
+    with op.get_context().autocommit_block():
+        for index in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index};")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for index in reversed(INDEXES):
+            name = index.split()[0]
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,33 @@
+"""notify phone changes
+
+Revision ID: 3e8a1c6f5d29
+Revises: 0b6d93e5a7c4
+Create Date: 2025-06-25 11:42:08.917304
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3e8a1c6f5d29"
+down_revision: Union[str, None] = "0b6d93e5a7c4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE TRIGGER phone_number_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON phone_number
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_organization_changed();
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER phone_number_changed ON phone_number")
@@ -0,0 +1,45 @@
+"""notify category changes
+
+Revision ID: 4c1d2e7a9b3f
+Revises: 93110f5e937a
+Create Date: 2025-06-02 11:40:21.314159
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4c1d2e7a9b3f"
+down_revision: Union[str, None] = "93110f5e937a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_category_changed()
+        RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('category_changed', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER category_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON category
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_category_changed();
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER category_changed ON category")
+    op.execute("DROP FUNCTION notify_category_changed()")
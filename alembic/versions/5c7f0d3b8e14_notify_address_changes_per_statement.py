@@ -0,0 +1,201 @@
+"""notify address changes per statement
+
+Revision ID: 5c7f0d3b8e14
+Revises: 3e8a1c6f5d29
+Create Date: 2025-06-27 14:06:31.552817
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c7f0d3b8e14"
+down_revision: Union[str, None] = "3e8a1c6f5d29"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Transition tables allow only one event per trigger.
+TRIGGERS = (
+    ("address_inserted", "INSERT", "address", "NEW TABLE AS new_rows"),
+    (
+        "address_updated",
+        "UPDATE",
+        "address",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    ),
+    ("address_deleted", "DELETE", "address", "OLD TABLE AS old_rows"),
+    ("organization_inserted", "INSERT", "organization", "NEW TABLE AS new_rows"),
+    (
+        "organization_updated",
+        "UPDATE",
+        "organization",
+        "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    ),
+    ("organization_deleted", "DELETE", "organization", "OLD TABLE AS old_rows"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP TRIGGER organization_moved ON organization")
+    op.execute("DROP TRIGGER address_changed ON address")
+    op.execute("DROP FUNCTION notify_organization_moved()")
+    op.execute("DROP FUNCTION notify_address_changed()")
+    # One notification per statement, listing the distinct affected points as
+    # "lon lat;lon lat". Past the NOTIFY payload limit the payload is empty,
+    # which means everything may have changed.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_points_changed(points TEXT)
+        RETURNS void AS $$
+        BEGIN
+            IF points IS NOT NULL THEN
+                PERFORM pg_notify(
+                    'address_changed',
+                    CASE WHEN octet_length(points) < 8000 THEN points ELSE '' END
+                );
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_addresses_changed()
+        RETURNS trigger AS $$
+        DECLARE
+            points TEXT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT string_agg(DISTINCT lon || ' ' || lat, ';') INTO points
+                FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT string_agg(DISTINCT lon || ' ' || lat, ';') INTO points
+                FROM old_rows;
+            ELSE
+                SELECT string_agg(DISTINCT lon || ' ' || lat, ';') INTO points
+                FROM (
+                    SELECT lon, lat FROM old_rows
+                    UNION ALL
+                    SELECT lon, lat FROM new_rows
+                ) AS changed;
+            END IF;
+            PERFORM notify_points_changed(points);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_organizations_moved()
+        RETURNS trigger AS $$
+        DECLARE
+            points TEXT;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT string_agg(DISTINCT a.lon || ' ' || a.lat, ';') INTO points
+                FROM address AS a
+                WHERE a.id IN (SELECT address_id FROM new_rows);
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT string_agg(DISTINCT a.lon || ' ' || a.lat, ';') INTO points
+                FROM address AS a
+                WHERE a.id IN (SELECT address_id FROM old_rows);
+            ELSE
+                SELECT string_agg(DISTINCT a.lon || ' ' || a.lat, ';') INTO points
+                FROM address AS a
+                WHERE a.id IN (
+                    SELECT unnest(ARRAY[o.address_id, n.address_id])
+                    FROM old_rows AS o JOIN new_rows AS n USING (id)
+                    WHERE o.address_id IS DISTINCT FROM n.address_id
+                );
+            END IF;
+            PERFORM notify_points_changed(points);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    for name, event, table, transition in TRIGGERS:
+        function = (
+            "notify_addresses_changed"
+            if table == "address"
+            else "notify_organizations_moved"
+        )
+        op.execute(
+            f"""
+            CREATE TRIGGER {name}
+            AFTER {event} ON {table}
+            REFERENCING {transition}
+            FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+        """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, _, table, _ in reversed(TRIGGERS):
+        op.execute(f"DROP TRIGGER {name} ON {table}")
+    op.execute("DROP FUNCTION notify_organizations_moved()")
+    op.execute("DROP FUNCTION notify_addresses_changed()")
+    op.execute("DROP FUNCTION notify_points_changed(TEXT)")
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_address_changed()
+        RETURNS trigger AS $$
+        DECLARE
+            payload TEXT := '';
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                payload := ST_X(OLD.coordinates::geometry) || ' '
+                    || ST_Y(OLD.coordinates::geometry);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                payload := payload || ';' || ST_X(NEW.coordinates::geometry) || ' '
+                    || ST_Y(NEW.coordinates::geometry);
+            END IF;
+            PERFORM pg_notify('address_changed', payload);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_organization_moved()
+        RETURNS trigger AS $$
+        DECLARE
+            payload TEXT := '';
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                SELECT ST_X(coordinates::geometry) || ' ' || ST_Y(coordinates::geometry)
+                INTO payload FROM address WHERE id = OLD.address_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                payload := COALESCE(payload, '') || ';' || COALESCE((
+                    SELECT ST_X(coordinates::geometry) || ' ' || ST_Y(coordinates::geometry)
+                    FROM address WHERE id = NEW.address_id
+                ), '');
+            END IF;
+            PERFORM pg_notify('address_changed', COALESCE(payload, ''));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER address_changed
+        AFTER INSERT OR UPDATE OR DELETE ON address
+        FOR EACH ROW EXECUTE FUNCTION notify_address_changed();
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER organization_moved
+        AFTER INSERT OR DELETE OR UPDATE OF address_id ON organization
+        FOR EACH ROW EXECUTE FUNCTION notify_organization_moved();
+    """
+    )
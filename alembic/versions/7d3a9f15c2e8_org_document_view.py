@@ -0,0 +1,70 @@
+"""org document view
+
+Revision ID: 7d3a9f15c2e8
+Revises: e52f8c4b1a07
+Create Date: 2025-06-12 14:22:09.481516
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7d3a9f15c2e8"
+down_revision: Union[str, None] = "e52f8c4b1a07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Renders a float the way Python's str() does for coordinates: shortest
+    # round-trip digits, with ".0" kept on whole numbers.
+    op.execute(
+        """
+        CREATE FUNCTION org_document_float(value DOUBLE PRECISION)
+        RETURNS TEXT AS $$
+            SELECT value::text || CASE WHEN value = trunc(value) THEN '.0' ELSE '' END
+        $$ LANGUAGE sql IMMUTABLE;
+    """
+    )
+    # Same document as OrgFull, built the way OrganizationModule._select_orgs
+    # and _to_schema do.
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW org_document AS
+        SELECT
+            o.id,
+            json_build_object(
+                'id', o.id,
+                'name', o.name,
+                'coordinates',
+                    org_document_float(ST_Y(a.coordinates::geometry)) || ', '
+                    || org_document_float(ST_X(a.coordinates::geometry)),
+                'address',
+                    format('%s, %s, %s, %s', a.country, a.city, a.street, a.home),
+                'categories', COALESCE((
+                    SELECT json_agg(
+                        json_build_object(
+                            'id', c.id, 'parent_id', c.parent_id, 'name', c.name
+                        )
+                        ORDER BY c.id
+                    )
+                    FROM organization_category oc
+                    JOIN category c ON c.id = oc.cat_id
+                    WHERE oc.org_id = o.id
+                ), '[]'::json)
+            ) AS doc
+        FROM organization o
+        JOIN address a ON a.id = o.address_id;
+    """
+    )
+    # Required by REFRESH MATERIALIZED VIEW CONCURRENTLY.
+    op.execute("CREATE UNIQUE INDEX idx_org_document_id ON org_document (id);")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW org_document")
+    op.execute("DROP FUNCTION org_document_float(DOUBLE PRECISION)")
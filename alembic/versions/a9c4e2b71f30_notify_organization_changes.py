@@ -0,0 +1,53 @@
+"""notify organization changes
+
+Revision ID: a9c4e2b71f30
+Revises: 7d3a9f15c2e8
+Create Date: 2025-06-16 09:31:54.208719
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a9c4e2b71f30"
+down_revision: Union[str, None] = "7d3a9f15c2e8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_organization_changed()
+        RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('organization_changed', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER organization_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON organization
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_organization_changed();
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER organization_category_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON organization_category
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_organization_changed();
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER organization_category_changed ON organization_category")
+    op.execute("DROP TRIGGER organization_changed ON organization")
+    op.execute("DROP FUNCTION notify_organization_changed()")
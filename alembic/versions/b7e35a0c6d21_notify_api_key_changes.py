@@ -0,0 +1,45 @@
+"""notify api key changes
+
+Revision ID: b7e35a0c6d21
+Revises: 4c1d2e7a9b3f
+Create Date: 2025-06-04 16:12:08.271828
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7e35a0c6d21"
+down_revision: Union[str, None] = "4c1d2e7a9b3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_api_key_changed()
+        RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('api_key_changed', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER api_key_changed
+        AFTER UPDATE OR DELETE OR TRUNCATE ON api_key
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_api_key_changed();
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER api_key_changed ON api_key")
+    op.execute("DROP FUNCTION notify_api_key_changed()")
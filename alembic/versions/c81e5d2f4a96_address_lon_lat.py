@@ -0,0 +1,39 @@
+"""address lon lat
+
+Revision ID: c81e5d2f4a96
+Revises: a9c4e2b71f30
+Create Date: 2025-06-18 11:42:07.530194
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c81e5d2f4a96"
+down_revision: Union[str, None] = "a9c4e2b71f30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain copies of the coordinates, read instead of decoding the geography.
+    op.execute(
+        """
+        ALTER TABLE address
+        ADD COLUMN lon DOUBLE PRECISION
+            GENERATED ALWAYS AS (ST_X(coordinates::geometry)) STORED,
+        ADD COLUMN lat DOUBLE PRECISION
+            GENERATED ALWAYS AS (ST_Y(coordinates::geometry)) STORED;
+    """
+    )
+    # Finds the addresses at the points of address_changed notifications.
+    op.execute("CREATE INDEX idx_address_lon_lat ON address (lon, lat);")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX idx_address_lon_lat")
+    op.execute("ALTER TABLE address DROP COLUMN lat, DROP COLUMN lon")
@@ -0,0 +1,117 @@
+"""notify address changes
+
+Revision ID: e52f8c4b1a07
+Revises: b7e35a0c6d21
+Create Date: 2025-06-09 10:05:47.161803
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e52f8c4b1a07"
+down_revision: Union[str, None] = "b7e35a0c6d21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The payload lists the affected points as "lon lat;lon lat", an empty
+    # payload means everything may have changed.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_address_changed()
+        RETURNS trigger AS $$
+        DECLARE
+            payload TEXT := '';
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                payload := ST_X(OLD.coordinates::geometry) || ' '
+                    || ST_Y(OLD.coordinates::geometry);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                payload := payload || ';' || ST_X(NEW.coordinates::geometry) || ' '
+                    || ST_Y(NEW.coordinates::geometry);
+            END IF;
+            PERFORM pg_notify('address_changed', payload);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_organization_moved()
+        RETURNS trigger AS $$
+        DECLARE
+            payload TEXT := '';
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                SELECT ST_X(coordinates::geometry) || ' ' || ST_Y(coordinates::geometry)
+                INTO payload FROM address WHERE id = OLD.address_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                payload := COALESCE(payload, '') || ';' || COALESCE((
+                    SELECT ST_X(coordinates::geometry) || ' ' || ST_Y(coordinates::geometry)
+                    FROM address WHERE id = NEW.address_id
+                ), '');
+            END IF;
+            PERFORM pg_notify('address_changed', COALESCE(payload, ''));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_addresses_truncated()
+        RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('address_changed', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER address_changed
+        AFTER INSERT OR UPDATE OR DELETE ON address
+        FOR EACH ROW EXECUTE FUNCTION notify_address_changed();
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER organization_moved
+        AFTER INSERT OR DELETE OR UPDATE OF address_id ON organization
+        FOR EACH ROW EXECUTE FUNCTION notify_organization_moved();
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER address_truncated
+        AFTER TRUNCATE ON address
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_addresses_truncated();
+    """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER organization_truncated
+        AFTER TRUNCATE ON organization
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_addresses_truncated();
+    """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER organization_truncated ON organization")
+    op.execute("DROP TRIGGER address_truncated ON address")
+    op.execute("DROP TRIGGER organization_moved ON organization")
+    op.execute("DROP TRIGGER address_changed ON address")
+    op.execute("DROP FUNCTION notify_addresses_truncated()")
+    op.execute("DROP FUNCTION notify_organization_moved()")
+    op.execute("DROP FUNCTION notify_address_changed()")
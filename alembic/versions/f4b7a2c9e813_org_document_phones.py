@@ -0,0 +1,68 @@
+"""org document phones
+
+Revision ID: f4b7a2c9e813
+Revises: c81e5d2f4a96
+Create Date: 2025-06-20 16:08:33.914127
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f4b7a2c9e813"
+down_revision: Union[str, None] = "c81e5d2f4a96"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same document as OrgFull, built the way OrganizationModule._select_orgs
+# and _to_schema do. {phones} is the phones entry, if any.
+ORG_DOCUMENT = """
+    CREATE MATERIALIZED VIEW org_document AS
+    SELECT
+        o.id,
+        json_build_object(
+            'id', o.id,
+            'name', o.name,
+            'coordinates',
+                org_document_float(ST_Y(a.coordinates::geometry)) || ', '
+                || org_document_float(ST_X(a.coordinates::geometry)),
+            'address',
+                format('%s, %s, %s, %s', a.country, a.city, a.street, a.home),{phones}
+            'categories', COALESCE((
+                SELECT json_agg(
+                    json_build_object(
+                        'id', c.id, 'parent_id', c.parent_id, 'name', c.name
+                    )
+                    ORDER BY c.id
+                )
+                FROM organization_category oc
+                JOIN category c ON c.id = oc.cat_id
+                WHERE oc.org_id = o.id
+            ), '[]'::json)
+        ) AS doc
+    FROM organization o
+    JOIN address a ON a.id = o.address_id;
+"""
+
+PHONES = """
+            'phones', COALESCE((
+                SELECT json_agg(p.number ORDER BY p.number)
+                FROM phone_number p
+                WHERE p.org_id = o.id
+            ), '[]'::json),"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW org_document")
+    op.execute(ORG_DOCUMENT.format(phones=PHONES))
+    op.execute("CREATE UNIQUE INDEX idx_org_document_id ON org_document (id);")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW org_document")
+    op.execute(ORG_DOCUMENT.format(phones=""))
+    op.execute("CREATE UNIQUE INDEX idx_org_document_id ON org_document (id);")
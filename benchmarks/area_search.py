@@ -0,0 +1,161 @@
+"""Area search: envelope built by chained ST_Project CTEs vs computed client-side.
+
+Checks that both predicates return the same organizations and reports plan
+cost and latency of each. Run with ``python -m benchmarks.area_search``
+against a migrated database.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+from geoalchemy2 import Geography, Geometry
+from geoalchemy2 import functions as geo_func
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from benchmarks.common import SEED_ID_BASE, cleanup_seed, measure
+from services.backend.modules.organization.module import OrganizationModule
+from services.db import Db, get_db
+from services.db.models import Address, Organization
+
+CENTER = (37.6077, 55.7619)
+
+
+def legacy_area_filter(lon: float, lat: float, height: int, width: int):
+    """The area predicate OrganizationModule used before the client-side envelope."""
+    center = select(
+        geo_func.ST_SetSRID(geo_func.ST_MakePoint(lon, lat), 4326)
+        .cast(Geography)
+        .label("geom")
+    ).cte("center")
+    ns = select(
+        geo_func.ST_Project(center.c.geom, height / 2, func.radians(0)).label("north"),
+        geo_func.ST_Project(center.c.geom, height / 2, func.radians(180)).label(
+            "south"
+        ),
+    ).cte("ns")
+    corners = select(
+        geo_func.ST_Project(ns.c.north, width / 2, func.radians(90)).label("ne"),
+        geo_func.ST_Project(ns.c.south, width / 2, func.radians(270)).label("sw"),
+    ).cte("corners")
+    rectangle = select(
+        geo_func.ST_MakeEnvelope(
+            geo_func.ST_X(func.cast(corners.c.sw, Geometry)),
+            geo_func.ST_Y(func.cast(corners.c.sw, Geometry)),
+            geo_func.ST_X(func.cast(corners.c.ne, Geometry)),
+            geo_func.ST_Y(func.cast(corners.c.ne, Geometry)),
+            4326,
+        ).label("rect")
+    ).cte("rectangle")
+    return geo_func.ST_Intersects(
+        Address.coordinates,
+        func.cast(select(rectangle.c.rect).scalar_subquery(), Geography),
+    )
+
+
+def client_area_filter(lon: float, lat: float, height: int, width: int):
+    where, _ = OrganizationModule._by_area(lon, lat, height, width)
+    return where
+
+
+async def seed_grid(db: Db, side: int, step: float):
+    """``side`` x ``side`` organizations on a lon/lat grid around ``CENTER``."""
+    async with db.session_scope() as sess:
+        params = {
+            "base": SEED_ID_BASE,
+            "side": side,
+            "count": side * side,
+            "step": step,
+            "lon": CENTER[0],
+            "lat": CENTER[1],
+        }
+        await sess.execute(
+            text(
+                "INSERT INTO address (id, coordinates, country, city, street, home) "
+                "SELECT :base + g, ST_SetSRID(ST_MakePoint("
+                "CAST(:lon AS DOUBLE PRECISION) "
+                "+ (g % :side - :side / 2) * CAST(:step AS DOUBLE PRECISION), "
+                "CAST(:lat AS DOUBLE PRECISION) "
+                "+ (g / :side - :side / 2) * CAST(:step AS DOUBLE PRECISION)), "
+                "4326)::geography, "
+                "'Bench', 'Bench', 'Bench', g::text "
+                "FROM generate_series(0, :count - 1) AS g"
+            ),
+            params,
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO organization (id, name, address_id) "
+                "SELECT :base + g, 'bench org ' || g, :base + g "
+                "FROM generate_series(0, :count - 1) AS g"
+            ),
+            params,
+        )
+        await sess.execute(text("ANALYZE address"))
+        await sess.execute(text("ANALYZE organization"))
+
+
+def ids_query(where):
+    return (
+        select(Organization.id)
+        .join(Address, Address.id == Organization.address_id)
+        .where(where)
+    )
+
+
+async def plan_cost(db: Db, query) -> float:
+    compiled = query.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    async with db.session_scope() as sess:
+        res = await sess.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+        return res.scalar_one()[0]["Plan"]["Total Cost"]
+
+
+async def run(iterations: int, side: int, step: float) -> List[dict]:
+    db = get_db()
+    results = []
+    await cleanup_seed(db)
+    try:
+        await seed_grid(db, side, step)
+        for size in (100, 1_000, 10_000):
+            area = dict(lon=CENTER[0], lat=CENTER[1], height=size, width=size)
+            found = {}
+            for name, build in (
+                ("cte", legacy_area_filter),
+                ("client", client_area_filter),
+            ):
+                query = ids_query(build(**area))
+
+                async def call():
+                    async with db.session_scope() as sess:
+                        res = await sess.execute(query)
+                        return set(res.scalars().all())
+
+                found[name] = await call()
+                result = await measure(
+                    f"{size}m/{name}", call, db.engine, iterations=iterations
+                )
+                result["plan_cost"] = await plan_cost(db, query)
+                result["rows"] = len(found[name])
+                results.append(result)
+            if found["cte"] != found["client"]:
+                raise AssertionError(
+                    f"Result sets differ for {size}m: "
+                    f"{sorted(found['cte'] ^ found['client'])}"
+                )
+    finally:
+        await cleanup_seed(db)
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--side", type=int, default=300)
+    parser.add_argument("--step", type=float, default=0.0005)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations, args.side, args.step)), indent=2))
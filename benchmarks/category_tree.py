@@ -0,0 +1,149 @@
+"""Category tree search: recursive CTE vs the in-memory category index.
+
+The CTE is the search ``OrganizationModule`` ran before the index. Run with ``python -m benchmarks.category_tree`` against a migrated database.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+from sqlalchemy import select, text
+
+from benchmarks.common import SEED_ID_BASE, cleanup_seed, measure
+from services.backend import Backend
+from services.backend.modules.organization.module import OrganizationModule
+from services.db import Db, get_db
+from services.db.models import Category, Organization, OrganizationCategory
+
+# Large enough to return the whole seeded subtree in one page.
+PAGE_LIMIT = 10_000
+
+
+async def cte_search(module: OrganizationModule, cat_id: int, limit: int):
+    """Organizations of the category subtree, expanded by a recursive CTE."""
+    tree = select(Category.id).where(Category.id == cat_id).cte("tree", recursive=True)
+    tree = tree.union(select(Category.id).join(tree, Category.parent_id == tree.c.id))
+    where = (
+        select(OrganizationCategory.org_id)
+        .join(tree, tree.c.id == OrganizationCategory.cat_id)
+        .where(OrganizationCategory.org_id == Organization.id)
+        .exists()
+    )
+    return await module._fetch_page(where, [Organization.id], limit=limit)
+
+
+async def seed_tree(
+    db: Db, root_id: int, depth: int, fanout: int, orgs_per_category: int
+) -> int:
+    """Creates a tree of ``depth`` levels with ``fanout`` children per node."""
+    categories = [{"id": root_id, "parent_id": None, "name": f"bench {root_id}"}]
+    level = [root_id]
+    next_id = root_id + 1
+    for _ in range(depth - 1):
+        next_level = []
+        for parent_id in level:
+            for _ in range(fanout):
+                categories.append(
+                    {"id": next_id, "parent_id": parent_id, "name": f"bench {next_id}"}
+                )
+                next_level.append(next_id)
+                next_id += 1
+        level = next_level
+
+    addresses, organizations, links = [], [], []
+    for cat in categories:
+        for _ in range(orgs_per_category):
+            addresses.append(
+                {
+                    "id": next_id,
+                    "wkt": f"SRID=4326;POINT({30 + next_id * 1e-6} 50)",
+                    "home": str(next_id),
+                }
+            )
+            organizations.append(
+                {"id": next_id, "name": f"bench org {next_id}", "address_id": next_id}
+            )
+            links.append({"org_id": next_id, "cat_id": cat["id"]})
+            next_id += 1
+
+    async with db.session_scope() as sess:
+        # The tree is deeper than check_category_depth allows on purpose.
+        await sess.execute(
+            text("ALTER TABLE category DISABLE TRIGGER category_depth_limit")
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO category (id, parent_id, name) VALUES (:id, :parent_id, :name)"
+            ),
+            categories,
+        )
+        await sess.execute(
+            text("ALTER TABLE category ENABLE TRIGGER category_depth_limit")
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO address (id, coordinates, country, city, street, home) "
+                "VALUES (:id, ST_GeogFromText(:wkt), 'Bench', 'Bench', 'Bench', :home)"
+            ),
+            addresses,
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO organization (id, name, address_id) VALUES (:id, :name, :address_id)"
+            ),
+            organizations,
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO organization_category (org_id, cat_id) VALUES (:org_id, :cat_id)"
+            ),
+            links,
+        )
+    return next_id
+
+
+async def run(iterations: int) -> List[dict]:
+    db = get_db()
+    backend = Backend(db)
+
+    async def index(cat_id):
+        cat_ids = await backend.cat_module.get_subtree_ids(cat_id=cat_id)
+        return await backend.org_module.get_by_categories(
+            cat_ids=cat_ids, limit=PAGE_LIMIT
+        )
+
+    async def cte(cat_id):
+        return await cte_search(backend.org_module, cat_id, PAGE_LIMIT)
+
+    shapes = {
+        "deep": dict(depth=8, fanout=2, orgs_per_category=2),
+        "wide": dict(depth=2, fanout=500, orgs_per_category=2),
+    }
+    results = []
+    await cleanup_seed(db)
+    try:
+        next_id = SEED_ID_BASE
+        for shape, params in shapes.items():
+            root_id = next_id
+            next_id = await seed_tree(db, root_id=root_id, **params)
+            backend.cat_module.invalidate()
+            for name, call in (("cte", cte), ("index", index)):
+                result = await measure(
+                    f"{shape}/{name}",
+                    lambda: call(root_id),
+                    db.engine,
+                    iterations=iterations,
+                )
+                results.append({**result, **params})
+    finally:
+        await cleanup_seed(db)
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations)), indent=2))
@@ -0,0 +1,145 @@
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, List
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from services.db import Db
+
+# Rows created by the benchmarks use ids starting from here, so they can be
+# removed afterwards without touching the data from the migrations.
+SEED_ID_BASE = 1_000_000
+# Rows are also tagged, since real data may have reached those ids too:
+# seeded addresses have this country and seeded categories this name prefix.
+# Seeded organizations, phones and category links are found through them.
+SEED_COUNTRY = "Bench"
+SEED_CATEGORY_PREFIX = "bench "
+
+
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, *args, **kwargs):
+        self.count += 1
+
+    def transaction(self, conn, *args, **kwargs):
+        # Autocommit connections send no BEGIN/COMMIT/ROLLBACK to the server.
+        if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+            self.count += 1
+
+
+@contextmanager
+def count_round_trips(engine: AsyncEngine) -> Iterator[RoundTripCounter]:
+    """Counts statements plus BEGIN/COMMIT/ROLLBACK issued through the engine."""
+    counter = RoundTripCounter()
+    sync_engine = engine.sync_engine
+    listeners = (
+        ("before_cursor_execute", counter),
+        ("begin", counter.transaction),
+        ("commit", counter.transaction),
+        ("rollback", counter.transaction),
+    )
+    for name, listener in listeners:
+        event.listen(sync_engine, name, listener)
+    try:
+        yield counter
+    finally:
+        for name, listener in listeners:
+            event.remove(sync_engine, name, listener)
+
+
+class PoolWait:
+    def __init__(self):
+        self.checkouts = 0
+        self.seconds = 0.0
+
+
+@contextmanager
+def measure_pool_wait(engine: AsyncEngine) -> Iterator[PoolWait]:
+    """Time spent getting connections from the engine's pool.
+
+    Wraps the pool's internal checkout, so it includes both waiting for a
+    free connection and opening a new one.
+    """
+    pool = engine.sync_engine.pool
+    do_get = pool._do_get
+    wait = PoolWait()
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            wait.checkouts += 1
+            wait.seconds += time.perf_counter() - start
+
+    pool._do_get = timed_do_get
+    try:
+        yield wait
+    finally:
+        del pool._do_get
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def measure(
+    name: str,
+    call: Callable[[], Awaitable],
+    engine: AsyncEngine,
+    iterations: int = 200,
+    warmup: int = 10,
+) -> dict:
+    for _ in range(warmup):
+        await call()
+    timings = []
+    cpu_start = time.process_time()
+    with count_round_trips(engine) as counter:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await call()
+            timings.append((time.perf_counter() - start) * 1000)
+    cpu_ms = (time.process_time() - cpu_start) * 1000
+    return {
+        "name": name,
+        "iterations": iterations,
+        "round_trips_per_call": counter.count / iterations,
+        "cpu_ms_per_call": cpu_ms / iterations,
+        "mean_ms": sum(timings) / len(timings),
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "p99_ms": percentile(timings, 99),
+    }
+
+
+async def cleanup_seed(db: Db):
+    """Removes the rows created by the benchmarks, matched by id and tag."""
+    seeded_orgs = (
+        "SELECT o.id FROM organization AS o JOIN address AS a ON a.id = o.address_id "
+        "WHERE a.id >= :base AND a.country = :country"
+    )
+    seeded_categories = (
+        "SELECT id FROM category WHERE id >= :base AND starts_with(name, :prefix)"
+    )
+    async with db.session_scope() as sess:
+        for statement in (
+            f"DELETE FROM phone_number WHERE org_id IN ({seeded_orgs})",
+            f"DELETE FROM organization_category WHERE org_id IN ({seeded_orgs}) "
+            f"OR cat_id IN ({seeded_categories})",
+            f"DELETE FROM organization WHERE id IN ({seeded_orgs})",
+            "DELETE FROM address WHERE id >= :base AND country = :country",
+            f"DELETE FROM category WHERE id IN ({seeded_categories})",
+        ):
+            await sess.execute(
+                text(statement),
+                {
+                    "base": SEED_ID_BASE,
+                    "country": SEED_COUNTRY,
+                    "prefix": SEED_CATEGORY_PREFIX,
+                },
+            )
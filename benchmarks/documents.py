@@ -0,0 +1,79 @@
+"""Organization searches rendered by the API vs served from ``org_document``.
+
+Refreshes the view, checks every document equals the ``OrgFull`` the regular
+query builds for the same organization, then reports latency and CPU of both
+paths. Run with ``python -m benchmarks.documents`` against a migrated
+database.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+from sqlalchemy import select
+
+from benchmarks.common import measure
+from services.backend import Backend
+from services.db import get_db
+from services.db.models import Organization
+
+
+async def check_parity(backend: Backend) -> int:
+    async with backend.db.session_scope() as sess:
+        res = await sess.execute(select(Organization.id))
+        org_ids = list(res.scalars())
+    module = backend.org_module
+    orgs = await module.get_by_ids(org_ids=org_ids)
+    documents = await module.get_by_ids(org_ids=org_ids, documents=True)
+    for org, document in zip(orgs, documents):
+        if json.loads(document) != org.model_dump(mode="json"):
+            raise AssertionError(f"Document differs for {org.id}: {document}")
+    return len(org_ids)
+
+
+async def run(iterations: int, cat_id: int, limit: int) -> List[dict]:
+    db = get_db()
+    backend = Backend(db)
+    module = backend.org_module
+    results = []
+    try:
+        await module.refresh_documents(concurrently=False)
+        checked = await check_parity(backend)
+        cat_ids = await backend.cat_module.get_subtree_ids(cat_id=cat_id)
+        for documents in (False, True):
+            for name, call in (
+                (
+                    "category",
+                    lambda: module.get_by_categories(
+                        cat_ids=cat_ids, limit=limit, documents=documents
+                    ),
+                ),
+                (
+                    "name",
+                    lambda: module.get_by_name(
+                        name="%", limit=limit, documents=documents
+                    ),
+                ),
+            ):
+                result = await measure(
+                    f"{name}/{'documents' if documents else 'orgs'}",
+                    call,
+                    db.engine,
+                    iterations=iterations,
+                )
+                results.append({**result, "documents_checked": checked})
+    finally:
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--cat-id", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    print(
+        json.dumps(asyncio.run(run(args.iterations, args.cat_id, args.limit)), indent=2)
+    )
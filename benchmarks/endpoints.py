@@ -0,0 +1,240 @@
+"""Load test of every route of ``services/app/api/v1/organization.py``.
+
+For each ``--organizations`` size the synthetic dataset from
+``benchmarks.seed`` is created, then every route is called ``--requests``
+times by ``--concurrency`` concurrent clients. Requests go straight to the
+ASGI app in-process, so the numbers cover the app and the database without
+any HTTP server or network in between. Caches and request coalescing stay
+enabled, as in production. Reports RPS, latency percentiles,
+database round trips and pool wait per request as JSON.
+
+Run with ``python -m benchmarks.endpoints --organizations 10000 100000 1000000``
+against a migrated database.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Callable, List, Tuple
+from urllib.parse import urlencode
+
+from benchmarks.common import (
+    SEED_ID_BASE,
+    cleanup_seed,
+    count_round_trips,
+    measure_pool_wait,
+    percentile,
+)
+from benchmarks.seed import CENTER, grid_point, seed_dataset
+from services.app.main import app
+from services.db import get_db
+
+# One of the keys created by the initial migration.
+DEFAULT_API_KEY = "216750ea-fd07-463f-b307-07b7dc9e6a74"
+
+# A route call: method, path, query parameters and JSON body.
+Call = Tuple[str, str, dict, bytes]
+
+
+async def call_app(method: str, path: str, params: dict, body: bytes) -> int:
+    """Sends one request to the ASGI app and reads the whole response."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": f"/api/v1{path}",
+        "raw_path": f"/api/v1{path}".encode(),
+        "root_path": "",
+        "query_string": urlencode(params).encode(),
+        "headers": [(b"host", b"bench"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    request = {"type": "http.request", "body": body, "more_body": False}
+    status = 0
+
+    async def receive():
+        nonlocal request
+        if request is not None:
+            message, request = request, None
+            return message
+        # The client never disconnects, responses are always read in full.
+        await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def routes(dataset: dict, api_key: str) -> List[Tuple[str, Callable[[], Call]]]:
+    count = dataset["organizations"]
+    categories = dataset["category_ids"]
+    key = {"api_key": api_key}
+
+    def org_id():
+        return SEED_ID_BASE + random.randrange(count)
+
+    def coords():
+        lon, lat = grid_point(random.randrange(count), count)
+        return {"lon": lon, "lat": lat}
+
+    def point():
+        return {"lon": CENTER[0], "lat": CENTER[1]}
+
+    return [
+        ("coords", lambda: ("GET", "/org/coords", {**key, **coords()}, b"")),
+        ("id", lambda: ("GET", "/org/id", {**key, "org_id": org_id()}, b"")),
+        (
+            "batch",
+            lambda: (
+                "POST",
+                "/org/batch",
+                key,
+                json.dumps({"ids": [org_id() for _ in range(100)]}).encode(),
+            ),
+        ),
+        (
+            "category/root",
+            lambda: (
+                "GET",
+                "/org/category",
+                {**key, "cat_id": random.choice(categories["roots"])},
+                b"",
+            ),
+        ),
+        (
+            "category/leaf",
+            lambda: (
+                "GET",
+                "/org/category",
+                {**key, "cat_id": random.choice(categories["grandchildren"])},
+                b"",
+            ),
+        ),
+        ("name", lambda: ("GET", "/org/name", {**key, "name": "Bakery 1%"}, b"")),
+        (
+            "name/similar",
+            lambda: ("GET", "/org/name/similar", {**key, "name": "Bakery 1a2"}, b""),
+        ),
+        (
+            "radius",
+            lambda: (
+                "GET",
+                "/org/radius",
+                {**key, **point(), "radius_meters": 500},
+                b"",
+            ),
+        ),
+        (
+            "search",
+            lambda: (
+                "GET",
+                "/org/search",
+                {
+                    **key,
+                    **point(),
+                    "radius_meters": 500,
+                    "cat_id": random.choice(categories["roots"]),
+                    "name": "Bakery%",
+                },
+                b"",
+            ),
+        ),
+        (
+            "nearest",
+            lambda: ("GET", "/org/nearest", {**key, **coords(), "k": 10}, b""),
+        ),
+        (
+            "area",
+            lambda: (
+                "GET",
+                "/org/area",
+                {**key, **point(), "height": 1000, "width": 1000},
+                b"",
+            ),
+        ),
+    ]
+
+
+async def load(name: str, make_call, requests: int, concurrency: int) -> dict:
+    engine = get_db().engine
+    timings, errors = [], 0
+    remaining = requests
+
+    async def client():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            status = await call_app(*make_call())
+            timings.append((time.perf_counter() - start) * 1000)
+            errors += status >= 400
+
+    with count_round_trips(engine) as counter, measure_pool_wait(engine) as wait:
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "name": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "mean_ms": sum(timings) / len(timings),
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "p99_ms": percentile(timings, 99),
+        "round_trips_per_request": counter.count / requests,
+        "pool_wait_ms_per_request": wait.seconds * 1000 / requests,
+    }
+
+
+async def run(
+    sizes: List[int], requests: int, concurrency: int, warmup: int, api_key: str
+) -> List[dict]:
+    db = get_db()
+    results = []
+    async with app.router.lifespan_context(app):
+        for size in sizes:
+            await cleanup_seed(db)
+            try:
+                dataset = await seed_dataset(db, size)
+                for name, make_call in routes(dataset, api_key):
+                    await load(name, make_call, warmup, concurrency)
+                    result = await load(name, make_call, requests, concurrency)
+                    results.append({**result, "organizations": size})
+            finally:
+                await cleanup_seed(db)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--api-key", default=DEFAULT_API_KEY)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(
+                run(
+                    args.organizations,
+                    args.requests,
+                    args.concurrency,
+                    args.warmup,
+                    args.api_key,
+                )
+            ),
+            indent=2,
+        )
+    )
@@ -0,0 +1,135 @@
+"""ORM + Shapely hydration vs Core row projection, per 1k organizations.
+
+Run with ``python -m benchmarks.hydration`` against a migrated database.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+from geoalchemy2.shape import to_shape
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+
+from benchmarks.common import SEED_ID_BASE, cleanup_seed, measure
+from services.backend import Backend
+from services.backend.modules.category.schemas import CategoryFull
+from services.backend.modules.organization.schemas import OrgFull
+from services.db import Db, get_db
+from services.db.models import Organization
+
+
+async def seed_organizations(db: Db, count: int, categories_per_org: int):
+    categories = [
+        {"id": SEED_ID_BASE + i, "name": f"bench {i}"}
+        for i in range(categories_per_org)
+    ]
+    addresses, organizations, links = [], [], []
+    for i in range(count):
+        org_id = SEED_ID_BASE + i
+        addresses.append({"id": org_id, "wkt": f"SRID=4326;POINT({30 + i * 1e-6} 50)"})
+        organizations.append(
+            {"id": org_id, "name": f"bench org {i}", "address_id": org_id}
+        )
+        links.extend({"org_id": org_id, "cat_id": cat["id"]} for cat in categories)
+    async with db.session_scope() as sess:
+        await sess.execute(
+            text(
+                "INSERT INTO category (id, parent_id, name) VALUES (:id, NULL, :name)"
+            ),
+            categories,
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO address (id, coordinates, country, city, street, home) "
+                "VALUES (:id, ST_GeogFromText(:wkt), 'Bench', 'Bench', 'Bench', '1')"
+            ),
+            addresses,
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO organization (id, name, address_id) VALUES (:id, :name, :address_id)"
+            ),
+            organizations,
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO organization_category (org_id, cat_id) VALUES (:org_id, :cat_id)"
+            ),
+            links,
+        )
+
+
+async def orm_get_by_name(db: Db, name: str) -> List[OrgFull]:
+    """The ORM hydration path OrganizationModule used before the Core projection."""
+    query = (
+        select(Organization)
+        .options(
+            selectinload(Organization.categories),
+            selectinload(Organization.address),
+            selectinload(Organization.phones),
+        )
+        .where(Organization.name.ilike(name))
+        .order_by(Organization.id)
+    )
+    result = []
+    async with db.session_scope() as sess:
+        res = await sess.execute(query)
+        for org in res.scalars().all():
+            org_coords = to_shape(org.address.coordinates)
+            result.append(
+                OrgFull(
+                    id=org.id,
+                    name=org.name,
+                    coordinates=f"{org_coords.y}, {org_coords.x}",
+                    address=f"{org.address.country}, {org.address.city}, {org.address.street}, {org.address.home}",
+                    phones=sorted(phone.number for phone in org.phones),
+                    categories=[
+                        CategoryFull(id=cat.id, parent_id=cat.parent_id, name=cat.name)
+                        for cat in org.categories
+                    ],
+                )
+            )
+        sess.expunge_all()
+    return result
+
+
+async def run(iterations: int, count: int, categories_per_org: int) -> List[dict]:
+    db = get_db()
+    backend = Backend(db)
+    results = []
+    await cleanup_seed(db)
+    try:
+        await seed_organizations(db, count, categories_per_org)
+        pattern = "bench org %"
+        for name, call in (
+            ("orm", lambda: orm_get_by_name(db, pattern)),
+            (
+                "core",
+                lambda: backend.org_module.get_by_name(name=pattern, limit=count),
+            ),
+        ):
+            result = await measure(name, call, db.engine, iterations=iterations)
+            result["cpu_ms_per_1k_orgs"] = result["cpu_ms_per_call"] * 1000 / count
+            results.append({**result, "organizations": count})
+    finally:
+        await cleanup_seed(db)
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--organizations", type=int, default=1000)
+    parser.add_argument("--categories-per-org", type=int, default=3)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(
+                run(args.iterations, args.organizations, args.categories_per_org)
+            ),
+            indent=2,
+        )
+    )
@@ -0,0 +1,111 @@
+"""Name search: sequential scan vs the trigram GIN index, plus ranked fuzzy search.
+
+Seeds ``--organizations`` rows (1M by default) server-side with generate_series
+and reports EXPLAIN ANALYZE timings of each query with and without index scans.
+
+Run with ``python -m benchmarks.name_search`` against a migrated database.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+from sqlalchemy import text
+
+from benchmarks.common import SEED_ID_BASE, cleanup_seed, measure
+from services.backend import Backend
+from services.db import Db, get_db
+
+QUERIES = {
+    "ilike": (
+        "SELECT id FROM organization WHERE name ILIKE :pattern",
+        {"pattern": "%ake%7f3%"},
+    ),
+    "similarity": (
+        "SELECT id FROM organization WHERE name % :name "
+        "ORDER BY similarity(name, :name) DESC LIMIT 100",
+        {"name": "Bakery 7f3"},
+    ),
+}
+
+
+async def seed_organizations(db: Db, count: int):
+    async with db.session_scope() as sess:
+        await sess.execute(
+            text(
+                "INSERT INTO address (id, coordinates, country, city, street, home) "
+                "SELECT :base + g, "
+                "ST_SetSRID(ST_MakePoint(30 + g * 1e-6, 50), 4326)::geography, "
+                "'Bench', 'Bench', 'Bench', g::text "
+                "FROM generate_series(0, :count - 1) AS g"
+            ),
+            {"base": SEED_ID_BASE, "count": count},
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO organization (id, name, address_id) "
+                "SELECT :base + g, "
+                "(ARRAY['Coffee', 'Bakery', 'Pharmacy', 'Garage', 'Bookstore'])"
+                "[1 + g % 5] || ' ' || left(md5(g::text), 8), :base + g "
+                "FROM generate_series(0, :count - 1) AS g"
+            ),
+            {"base": SEED_ID_BASE, "count": count},
+        )
+        await sess.execute(text("ANALYZE organization"))
+
+
+async def explain(db: Db, query: str, params: dict, use_index: bool) -> dict:
+    async with db.session_scope() as sess:
+        if not use_index:
+            await sess.execute(text("SET LOCAL enable_bitmapscan = off"))
+            await sess.execute(text("SET LOCAL enable_indexscan = off"))
+        res = await sess.execute(
+            text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), params
+        )
+        plan = res.scalar_one()[0]
+    return {
+        "plan_root": plan["Plan"]["Node Type"],
+        "planning_ms": plan["Planning Time"],
+        "execution_ms": plan["Execution Time"],
+    }
+
+
+async def run(iterations: int, count: int) -> List[dict]:
+    db = get_db()
+    backend = Backend(db)
+    results = []
+    await cleanup_seed(db)
+    try:
+        await seed_organizations(db, count)
+        for name, (query, params) in QUERIES.items():
+            for use_index in (False, True):
+                result = await explain(db, query, params, use_index)
+                results.append(
+                    {
+                        "name": f"{name}/{'index' if use_index else 'seq_scan'}",
+                        "organizations": count,
+                        **result,
+                    }
+                )
+        for name, call in (
+            ("module/ilike", lambda: backend.org_module.get_by_name(name="%ake%7f3%")),
+            (
+                "module/similarity",
+                lambda: backend.org_module.get_by_similarity(name="Bakery 7f3"),
+            ),
+        ):
+            result = await measure(name, call, db.engine, iterations=iterations)
+            results.append({**result, "organizations": count})
+    finally:
+        await cleanup_seed(db)
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--organizations", type=int, default=1_000_000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.iterations, args.organizations)), indent=2))
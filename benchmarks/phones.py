@@ -0,0 +1,96 @@
+"""Phones in organization results: query count independent of result size.
+
+Seeds the synthetic dataset plus a second phone for every other
+organization, then runs searches of growing size and checks that each costs
+the same number of round trips and returns the phones stored for every
+organization. Run with ``python -m benchmarks.phones`` against a migrated
+database.
+"""
+
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from typing import List
+
+from sqlalchemy import select, text
+
+from benchmarks.common import SEED_ID_BASE, cleanup_seed, count_round_trips
+from benchmarks.seed import seed_dataset
+from services.backend.modules.organization.module import OrganizationModule
+from services.db import Db, get_db
+from services.db.models import PhoneNumber
+
+
+async def seed_second_phones(db: Db, count: int):
+    async with db.session_scope() as sess:
+        await sess.execute(
+            text(
+                "INSERT INTO phone_number (number, org_id) "
+                "SELECT '+7-901-' || lpad(g::text, 7, '0'), :base + g "
+                "FROM generate_series(0, :count - 1, 2) AS g"
+            ),
+            {"base": SEED_ID_BASE, "count": count},
+        )
+
+
+async def stored_phones(db: Db, org_ids: List[int]) -> dict:
+    async with db.session_scope() as sess:
+        res = await sess.execute(
+            select(PhoneNumber.org_id, PhoneNumber.number).where(
+                PhoneNumber.org_id.in_(org_ids)
+            )
+        )
+        phones = defaultdict(set)
+        for org_id, number in res.all():
+            phones[org_id].add(number)
+    return phones
+
+
+async def run(organizations: int, sizes: List[int]) -> List[dict]:
+    db = get_db()
+    module = OrganizationModule(db)
+    results = []
+    await cleanup_seed(db)
+    try:
+        await seed_dataset(db, organizations)
+        await seed_second_phones(db, organizations)
+        for size in sizes:
+            org_ids = [SEED_ID_BASE + i for i in range(size)]
+            for name, call in (
+                ("ids", lambda: module.get_by_ids(org_ids=org_ids)),
+                ("name", lambda: module.get_by_name(name="%", limit=size)),
+            ):
+                with count_round_trips(db.engine) as counter:
+                    result = await call()
+                orgs = result if isinstance(result, list) else result.items
+                stored = await stored_phones(db, [org.id for org in orgs])
+                for org in orgs:
+                    if set(org.phones) != stored[org.id]:
+                        raise AssertionError(f"Phones differ for {org.id}")
+                results.append(
+                    {
+                        "name": name,
+                        "organizations": len(orgs),
+                        "round_trips": counter.count,
+                        "phones": sum(len(org.phones) for org in orgs),
+                    }
+                )
+        for name in ("ids", "name"):
+            round_trips = {x["round_trips"] for x in results if x["name"] == name}
+            if len(round_trips) != 1:
+                raise AssertionError(
+                    f"{name}: round trips grow with results: {round_trips}"
+                )
+    finally:
+        await cleanup_seed(db)
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=10_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.organizations, args.sizes)), indent=2))
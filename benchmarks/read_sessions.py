@@ -0,0 +1,77 @@
+"""Queries per second of read-write vs read-only sessions.
+
+``session_scope`` wraps every query in BEGIN/COMMIT, ``read_session_scope``
+autocommits it. Each variant runs ``--workers`` concurrent loops fetching
+organizations by id for ``--seconds``. Rerun with
+``DB_PREPARED_STATEMENT_CACHE_SIZE=0`` to see the prepared statement cache
+effect.
+
+Run with ``python -m benchmarks.read_sessions`` against a migrated database.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from typing import List
+
+from sqlalchemy import select
+
+from benchmarks.common import count_round_trips
+from services.app.settings import settings
+from services.backend.modules.organization.module import OrganizationModule
+from services.db import Db, get_db
+from services.db.models import Organization
+
+
+async def qps(db: Db, name: str, scope, org_ids: List[int], workers: int, seconds):
+    ids = itertools.cycle(org_ids)
+    queries = 0
+
+    async def worker(deadline: float):
+        nonlocal queries
+        while time.perf_counter() < deadline:
+            query = OrganizationModule._select_orgs(Organization.id == next(ids))
+            async with scope() as sess:
+                res = await sess.execute(query)
+                res.all()
+            queries += 1
+
+    with count_round_trips(db.engine) as counter:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(start + seconds) for _ in range(workers)))
+        elapsed = time.perf_counter() - start
+    return {
+        "name": name,
+        "workers": workers,
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        "queries": queries,
+        "qps": queries / elapsed,
+        "round_trips_per_query": counter.count / queries if queries else 0.0,
+    }
+
+
+async def run(workers: int, seconds: float) -> List[dict]:
+    db = get_db()
+    try:
+        async with db.session_scope() as sess:
+            res = await sess.execute(select(Organization.id))
+            org_ids = list(res.scalars())
+        return [
+            await qps(db, name, scope, org_ids, workers, seconds)
+            for name, scope in (
+                ("session_scope", db.session_scope),
+                ("read_session_scope", db.read_session_scope),
+            )
+        ]
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.workers, args.seconds)), indent=2))
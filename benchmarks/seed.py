@@ -0,0 +1,189 @@
+"""Synthetic dataset for the benchmarks.
+
+Organizations get unique addresses on a grid around ``CENTER``, a phone
+number, and ``categories_per_org`` categories out of a three level tree, the
+deepest ``check_category_depth`` allows. Everything is generated server-side
+with generate_series, so a million organizations take seconds, and uses ids
+from ``SEED_ID_BASE`` and the ``SEED_COUNTRY`` and ``SEED_CATEGORY_PREFIX``
+tags so ``cleanup_seed`` removes it.
+
+Run with ``python -m benchmarks.seed --organizations 100000`` to seed and
+keep a dataset.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+
+from sqlalchemy import text
+
+from benchmarks.common import SEED_ID_BASE, cleanup_seed
+from services.db import Db, get_db
+
+CENTER = (37.6077, 55.7619)
+# Roughly 11 meters between neighbouring addresses.
+GRID_STEP = 0.0001
+
+ORG_NAMES = ["Coffee", "Bakery", "Pharmacy", "Garage", "Bookstore", "Barber"]
+
+
+def grid_point(g: int, count: int):
+    """Coordinates of the ``g``-th seeded address, as placed by the seed SQL."""
+    side = math.ceil(math.sqrt(count))
+    return (
+        CENTER[0] + (g % side - side // 2) * GRID_STEP,
+        CENTER[1] + (g // side - side // 2) * GRID_STEP,
+    )
+
+
+def category_ids(roots: int, fanout: int) -> dict:
+    """Ids of each tree level, roots first; ids are contiguous per level."""
+    first_child = SEED_ID_BASE + roots
+    first_grandchild = first_child + roots * fanout
+    return {
+        "roots": list(range(SEED_ID_BASE, first_child)),
+        "children": list(range(first_child, first_grandchild)),
+        "grandchildren": list(
+            range(first_grandchild, first_grandchild + roots * fanout**2)
+        ),
+    }
+
+
+async def seed_categories(db: Db, roots: int, fanout: int):
+    # One statement per level: the depth trigger looks the parents up, so they
+    # have to exist before their children are inserted.
+    ids = category_ids(roots, fanout)
+    levels = (
+        ("roots", "SELECT :first + g, NULL, 'bench root ' || g"),
+        ("children", "SELECT :first + g, :parent + g / :fanout, 'bench child ' || g"),
+        (
+            "grandchildren",
+            "SELECT :first + g, :parent + g / :fanout, 'bench leaf ' || g",
+        ),
+    )
+    async with db.session_scope() as sess:
+        parent = None
+        for level, select in levels:
+            await sess.execute(
+                text(
+                    f"INSERT INTO category (id, parent_id, name) {select} "
+                    "FROM generate_series(0, :count - 1) AS g"
+                ),
+                {
+                    "first": ids[level][0],
+                    "parent": parent,
+                    "fanout": fanout,
+                    "count": len(ids[level]),
+                },
+            )
+            parent = ids[level][0]
+
+
+async def seed_organizations(
+    db: Db, count: int, category_count: int, categories_per_org: int
+):
+    side = math.ceil(math.sqrt(count))
+    params = {
+        "base": SEED_ID_BASE,
+        "count": count,
+        "side": side,
+        "step": GRID_STEP,
+        "lon": CENTER[0],
+        "lat": CENTER[1],
+        "categories": category_count,
+        "per_org": categories_per_org,
+    }
+    statements = (
+        "INSERT INTO address (id, coordinates, country, city, street, home) "
+        "SELECT :base + g, ST_SetSRID(ST_MakePoint("
+        "CAST(:lon AS DOUBLE PRECISION) "
+        "+ (g % :side - :side / 2) * CAST(:step AS DOUBLE PRECISION), "
+        "CAST(:lat AS DOUBLE PRECISION) "
+        "+ (g / :side - :side / 2) * CAST(:step AS DOUBLE PRECISION)), "
+        "4326)::geography, "
+        "'Bench', 'Bench', 'Street ' || g / 100, (g % 100)::text "
+        "FROM generate_series(0, :count - 1) AS g",
+        "INSERT INTO organization (id, name, address_id) "
+        "SELECT :base + g, "
+        f"(ARRAY{ORG_NAMES!r})[1 + g % {len(ORG_NAMES)}] "
+        "|| ' ' || left(md5(g::text), 8), "
+        ":base + g FROM generate_series(0, :count - 1) AS g",
+        "INSERT INTO phone_number (number, org_id) "
+        "SELECT '+7-900-' || lpad(g::text, 7, '0'), :base + g "
+        "FROM generate_series(0, :count - 1) AS g",
+        # Categories spread with a multiplicative hash, distinct per organization.
+        "INSERT INTO organization_category (org_id, cat_id) "
+        "SELECT DISTINCT :base + g, "
+        ":base + ((g * 2654435761 + c * 40503) % :categories) "
+        "FROM generate_series(0, :count - 1) AS g, "
+        "generate_series(0, :per_org - 1) AS c",
+    )
+    async with db.session_scope() as sess:
+        for statement in statements:
+            await sess.execute(text(statement), params)
+    async with db.session_scope() as sess:
+        for table in (
+            "address",
+            "organization",
+            "organization_category",
+            "category",
+            "phone_number",
+        ):
+            await sess.execute(text(f"ANALYZE {table}"))
+
+
+async def seed_dataset(
+    db: Db,
+    organizations: int,
+    roots: int = 10,
+    fanout: int = 10,
+    categories_per_org: int = 2,
+) -> dict:
+    """Seeds the dataset and describes it: sizes and category ids per level."""
+    start = time.perf_counter()
+    await seed_categories(db, roots, fanout)
+    categories = category_ids(roots, fanout)
+    category_count = sum(len(ids) for ids in categories.values())
+    await seed_organizations(db, organizations, category_count, categories_per_org)
+    return {
+        "organizations": organizations,
+        "categories": category_count,
+        "categories_per_org": categories_per_org,
+        "category_ids": categories,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+async def run(organizations: int, roots: int, fanout: int, per_org: int) -> dict:
+    db = get_db()
+    try:
+        await cleanup_seed(db)
+        dataset = await seed_dataset(db, organizations, roots, fanout, per_org)
+    finally:
+        await db.close()
+    del dataset["category_ids"]
+    return dataset
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=10_000)
+    parser.add_argument("--roots", type=int, default=10)
+    parser.add_argument("--fanout", type=int, default=10)
+    parser.add_argument("--categories-per-org", type=int, default=2)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(
+                run(
+                    args.organizations,
+                    args.roots,
+                    args.fanout,
+                    args.categories_per_org,
+                )
+            ),
+            indent=2,
+        )
+    )
@@ -0,0 +1,114 @@
+"""Category search on heavily multi-categorized data: rows fetched vs returned.
+
+Seeds organizations with ``--categories-per-org`` categories each and
+searches a root category, whose subtree holds many of every organization's
+categories, three ways:
+
+- ``join``: organizations joined with their category links, deduplicated in
+  Python, like the ORM code before the Core projection;
+- ``in``: the ``IN (subquery)`` semi-join the module used before ``EXISTS``;
+- ``exists``: ``OrganizationModule.get_by_categories``.
+
+Reports rows fetched from the database vs organizations returned, with
+latency. Run with ``python -m benchmarks.semi_join`` against a migrated
+database.
+"""
+
+import argparse
+import asyncio
+import json
+from typing import List
+
+from sqlalchemy import select
+
+from benchmarks.common import cleanup_seed, measure
+from benchmarks.seed import seed_dataset
+from services.backend.modules.organization.module import OrganizationModule
+from services.db import Db, get_db
+from services.db.models import Organization, OrganizationCategory
+
+
+async def fetch(db: Db, query) -> list:
+    async with db.read_session_scope() as sess:
+        res = await sess.execute(query)
+        return res.all()
+
+
+async def run(
+    organizations: int, categories_per_org: int, iterations: int
+) -> List[dict]:
+    db = get_db()
+    module = OrganizationModule(db)
+    results = []
+    await cleanup_seed(db)
+    try:
+        dataset = await seed_dataset(
+            db, organizations, roots=1, fanout=10, categories_per_org=categories_per_org
+        )
+        cat_ids = [
+            cat_id for level in dataset["category_ids"].values() for cat_id in level
+        ]
+        join = (
+            module._select_orgs(OrganizationCategory.cat_id.in_(cat_ids))
+            .join(OrganizationCategory, OrganizationCategory.org_id == Organization.id)
+            .order_by(Organization.id)
+        )
+        semi_join = module._select_orgs(
+            Organization.id.in_(
+                select(OrganizationCategory.org_id).where(
+                    OrganizationCategory.cat_id.in_(cat_ids)
+                )
+            )
+        ).order_by(Organization.id)
+
+        async def by_join():
+            rows, seen = await fetch(db, join), set()
+            orgs = [row for row in rows if not (row.id in seen or seen.add(row.id))]
+            return rows, orgs
+
+        async def by_in():
+            rows = await fetch(db, semi_join)
+            return rows, rows
+
+        async def by_exists():
+            page = await module.get_by_categories.__wrapped__(
+                module, cat_ids=cat_ids, limit=organizations * 2
+            )
+            return page.items, page.items
+
+        returned = None
+        for name, call in (("join", by_join), ("in", by_in), ("exists", by_exists)):
+            rows, orgs = await call()
+            ids = [org.id for org in orgs]
+            if returned is not None and ids != returned:
+                raise AssertionError(f"{name} returns different organizations")
+            returned = ids
+            result = await measure(name, call, db.engine, iterations=iterations)
+            results.append(
+                {
+                    **result,
+                    "rows_fetched": len(rows),
+                    "organizations_returned": len(orgs),
+                    "categories_per_org": categories_per_org,
+                }
+            )
+    finally:
+        await cleanup_seed(db)
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=10_000)
+    parser.add_argument("--categories-per-org", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(
+                run(args.organizations, args.categories_per_org, args.iterations)
+            ),
+            indent=2,
+        )
+    )
@@ -0,0 +1,108 @@
+"""Fails when an endpoint query sequentially scans a large table.
+
+Seeds the synthetic dataset, calls every route of the load test (plain and
+with ``documents=true``) while recording each statement the app executes,
+then EXPLAINs every recorded statement with its parameters and reports the
+Seq Scan nodes on tables with at least ``--min-rows`` rows. Exits with
+status 1 when there are any. Run with ``python -m benchmarks.seq_scans``
+against a migrated database.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from typing import Iterator, List
+
+from sqlalchemy import event, text
+
+from benchmarks.common import cleanup_seed
+from benchmarks.endpoints import DEFAULT_API_KEY, call_app, routes
+from benchmarks.seed import seed_dataset
+from services.app.main import app
+from services.db import get_db
+
+
+def plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from plan_nodes(child)
+
+
+async def record_statements(dataset: dict, api_key: str) -> dict:
+    """Distinct SELECT statements executed by the routes, with parameters."""
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, many):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.setdefault(statement, parameters)
+
+    engine = get_db().engine.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for name, make_call in routes(dataset, api_key):
+            for documents in (False, True):
+                method, path, params, body = make_call()
+                if documents:
+                    params = {**params, "documents": "true"}
+                status = await call_app(method, path, params, body)
+                if status >= 400:
+                    raise AssertionError(f"{name} failed with {status}")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+async def seq_scans(statements: dict, min_rows: int) -> List[dict]:
+    db = get_db()
+    found = []
+    async with db.session_scope() as sess:
+        res = await sess.execute(
+            text(
+                "SELECT relname, reltuples FROM pg_class "
+                "WHERE relkind IN ('r', 'm') AND reltuples >= :min_rows"
+            ),
+            {"min_rows": min_rows},
+        )
+        large = dict(res.all())
+        conn = await sess.connection()
+        raw = await conn.get_raw_connection()
+        for statement, parameters in statements.items():
+            plan = await raw.driver_connection.fetchval(
+                f"EXPLAIN (FORMAT JSON) {statement}", *(parameters or ())
+            )
+            for node in plan_nodes(json.loads(plan)[0]["Plan"]):
+                relation = node.get("Relation Name")
+                if node["Node Type"] == "Seq Scan" and relation in large:
+                    found.append(
+                        {
+                            "relation": relation,
+                            "rows": large[relation],
+                            "statement": " ".join(statement.split()),
+                        }
+                    )
+    return found
+
+
+async def run(organizations: int, min_rows: int, api_key: str) -> dict:
+    db = get_db()
+    async with app.router.lifespan_context(app):
+        await cleanup_seed(db)
+        try:
+            dataset = await seed_dataset(db, organizations)
+            statements = await record_statements(dataset, api_key)
+            found = await seq_scans(statements, min_rows)
+        finally:
+            await cleanup_seed(db)
+    return {"statements": len(statements), "seq_scans": found}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=100_000)
+    parser.add_argument("--min-rows", type=int, default=10_000)
+    parser.add_argument("--api-key", default=DEFAULT_API_KEY)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.organizations, args.min_rows, args.api_key))
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["seq_scans"] else 0)
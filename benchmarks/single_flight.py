@@ -0,0 +1,126 @@
+"""Bursts of identical concurrent requests with and without single-flight.
+
+Fires ``--concurrency`` equal searches at once and reports the wall time, the
+peak number of checked out pool connections and how many callers were
+coalesced. Without coalescing every caller takes its own connection, so a
+burst larger than the pool waits for (or times out on) a free one.
+
+Run with ``python -m benchmarks.single_flight`` against a migrated database.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.common import count_round_trips, percentile
+from services.backend import Backend
+from services.backend.modules.organization.module import OrganizationModule
+from services.db import get_db
+
+CENTER = (37.6077, 55.7619)
+
+
+class PoolGauge:
+    def __init__(self):
+        self.checked_out = 0
+        self.peak = 0
+
+    def checkout(self, *args):
+        self.checked_out += 1
+        self.peak = max(self.peak, self.checked_out)
+
+    def checkin(self, *args):
+        self.checked_out -= 1
+
+
+@contextmanager
+def gauge_pool(engine: AsyncEngine) -> Iterator[PoolGauge]:
+    gauge = PoolGauge()
+    pool = engine.sync_engine.pool
+    event.listen(pool, "checkout", gauge.checkout)
+    event.listen(pool, "checkin", gauge.checkin)
+    try:
+        yield gauge
+    finally:
+        event.remove(pool, "checkout", gauge.checkout)
+        event.remove(pool, "checkin", gauge.checkin)
+
+
+async def burst(backend: Backend, name: str, call, concurrency: int, rounds: int):
+    module = backend.org_module
+    coalesced = module.single_flight.coalesced
+    timings = []
+    failures = 0
+    with gauge_pool(backend.db.engine) as gauge, count_round_trips(
+        backend.db.engine
+    ) as counter:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(call(module) for _ in range(concurrency)), return_exceptions=True
+            )
+            timings.append((time.perf_counter() - start) * 1000)
+            failures += sum(isinstance(x, Exception) for x in results)
+    return {
+        "name": name,
+        "concurrency": concurrency,
+        "rounds": rounds,
+        "failures": failures,
+        "peak_connections": gauge.peak,
+        "round_trips_per_burst": counter.count / rounds,
+        "coalesced": module.single_flight.coalesced - coalesced,
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+    }
+
+
+async def run(concurrency: int, rounds: int, cat_id: int) -> List[dict]:
+    db = get_db()
+    backend = Backend(db)
+    results = []
+    try:
+        cat_ids = await backend.cat_module.get_subtree_ids(cat_id=cat_id)
+        searches = {
+            "category_tree": (
+                OrganizationModule.get_by_categories,
+                dict(cat_ids=cat_ids),
+            ),
+            "radius": (
+                OrganizationModule.get_by_radius,
+                dict(lon=CENTER[0], lat=CENTER[1], radius_meters=1000),
+            ),
+        }
+        for search, (method, params) in searches.items():
+            for coalesced in (False, True):
+                target = method if coalesced else method.__wrapped__
+                results.append(
+                    await burst(
+                        backend,
+                        f"{search}/{'single_flight' if coalesced else 'direct'}",
+                        lambda module: target(module, **params),
+                        concurrency,
+                        rounds,
+                    )
+                )
+    finally:
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--cat-id", type=int, default=1)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(run(args.concurrency, args.rounds, args.cat_id)), indent=2
+        )
+    )
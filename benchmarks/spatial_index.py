@@ -0,0 +1,152 @@
+"""Geo searches through the in-memory spatial index vs PostGIS alone.
+
+Seeds the synthetic dataset, checks that radius, area and coords searches
+return the same pages with and without the index, including after an
+organization is added and removed and the index refreshed incrementally,
+then reports latency and CPU of both. Run with
+``python -m benchmarks.spatial_index`` against a migrated database.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from typing import List
+
+from sqlalchemy import text
+
+from benchmarks.common import SEED_ID_BASE, cleanup_seed, measure
+from benchmarks.seed import CENTER, GRID_STEP, grid_point, seed_dataset
+from services.backend.modules.organization.module import OrganizationModule
+from services.backend.modules.organization.spatial import SpatialIndex
+from services.db import Db, get_db
+
+
+def searches(count: int, samples: int) -> List[tuple]:
+    """``(method, kwargs)`` of random searches around the seeded grid."""
+    rng = random.Random(count)
+    result = []
+    for _ in range(samples):
+        lon, lat = grid_point(rng.randrange(count), count)
+        size = rng.choice((10, 100, 500, 2_000))
+        result.append(("get_by_radius", dict(lon=lon, lat=lat, radius_meters=size)))
+        result.append(
+            ("get_by_area", dict(lon=lon, lat=lat, height=size, width=size * 2))
+        )
+        result.append(("get_by_coords", dict(lon=lon, lat=lat)))
+    return result
+
+
+async def all_ids(module: OrganizationModule, method: str, kwargs: dict) -> List[int]:
+    """Ids of every page of the search, in order."""
+    call = getattr(module, method).__wrapped__
+    if method == "get_by_coords":
+        return [org.id for org in await call(module, **kwargs)]
+    ids, cursor = [], None
+    while True:
+        page = await call(module, **kwargs, limit=1000, cursor=cursor)
+        ids.extend(org.id for org in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return ids
+
+
+async def check_parity(indexed, plain, checks: List[tuple]) -> int:
+    for method, kwargs in checks:
+        expected = await all_ids(plain, method, kwargs)
+        found = await all_ids(indexed, method, kwargs)
+        if found != expected:
+            raise AssertionError(
+                f"{method}({kwargs}) differs: {sorted(set(found) ^ set(expected))}"
+            )
+    return len(checks)
+
+
+async def check_refresh(db: Db, indexed, plain, count: int) -> int:
+    """Adds and removes an organization, refreshing the index like notifications."""
+    org_id = SEED_ID_BASE + count
+    # Just outside the grid, on a point no seeded address has.
+    lon, lat = CENTER[0] + GRID_STEP / 2, CENTER[1] + GRID_STEP / 2
+    payload = f"{lon} {lat}"
+    point = dict(lon=lon, lat=lat)
+    checks = [
+        ("get_by_coords", point),
+        ("get_by_radius", dict(**point, radius_meters=50)),
+        ("get_by_area", dict(**point, height=50, width=50)),
+    ]
+    async with db.session_scope() as sess:
+        await sess.execute(
+            text(
+                "INSERT INTO address (id, coordinates, country, city, street, home) "
+                "VALUES (:id, ST_SetSRID(ST_MakePoint("
+                "CAST(:lon AS DOUBLE PRECISION), CAST(:lat AS DOUBLE PRECISION)), "
+                "4326)::geography, 'Bench', 'Bench', 'Refresh', '1')"
+            ),
+            {"id": org_id, "lon": lon, "lat": lat},
+        )
+        await sess.execute(
+            text(
+                "INSERT INTO organization (id, name, address_id) "
+                "VALUES (:id, 'bench refresh', :id)"
+            ),
+            {"id": org_id},
+        )
+    indexed.spatial.invalidate_payload(f";{payload}")
+    await indexed.refresh_spatial_index()
+    if org_id not in await all_ids(indexed, "get_by_coords", point):
+        raise AssertionError("Added organization missing after refresh")
+    checked = await check_parity(indexed, plain, checks)
+    async with db.session_scope() as sess:
+        await sess.execute(
+            text("DELETE FROM organization WHERE id = :id"), {"id": org_id}
+        )
+        await sess.execute(text("DELETE FROM address WHERE id = :id"), {"id": org_id})
+    indexed.spatial.invalidate_payload(payload)
+    await indexed.refresh_spatial_index()
+    if len(indexed.spatial.at(lon, lat)):
+        raise AssertionError("Removed organization still indexed after refresh")
+    return checked + await check_parity(indexed, plain, checks)
+
+
+async def run(organizations: int, samples: int, iterations: int) -> List[dict]:
+    db = get_db()
+    results = []
+    await cleanup_seed(db)
+    try:
+        await seed_dataset(db, organizations)
+        plain = OrganizationModule(db)
+        indexed = OrganizationModule(db)
+        indexed.spatial = SpatialIndex()
+        await indexed.refresh_spatial_index()
+        checks = searches(organizations, samples)
+        checked = await check_parity(indexed, plain, checks)
+        checked += await check_refresh(db, indexed, plain, organizations)
+        for method, kwargs in checks[:3]:
+            for name, module in (("postgis", plain), ("index", indexed)):
+                call = getattr(module, method).__wrapped__
+                result = await measure(
+                    f"{method}/{name}",
+                    lambda: call(module, **kwargs),
+                    db.engine,
+                    iterations=iterations,
+                )
+                results.append({**result, **kwargs, "searches_checked": checked})
+        results.append({"name": "index", **indexed.spatial.stats()})
+    finally:
+        await cleanup_seed(db)
+        await db.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(run(args.organizations, args.samples, args.iterations)),
+            indent=2,
+        )
+    )
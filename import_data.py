@@ -0,0 +1,61 @@
+"""Bulk import of organizations from CSV or NDJSON.
+
+Every record is one organization: ``id`` (optional, an existing id is
+updated), ``name``, ``lon``, ``lat``, ``country``, ``city``, ``street``,
+``home``, ``phones`` and ``categories`` (category ids). In CSV the last two
+are separated by ";". Reads stdin when the file is "-". Prints the import
+statistics as JSON.
+
+Run with ``python import_data.py organizations.csv``.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from services.backend.modules.organization.importer import (
+    DEFAULT_BATCH_SIZE,
+    OrganizationImporter,
+    read_csv,
+    read_ndjson,
+)
+from services.db import get_db
+
+READERS = {"csv": read_csv, "ndjson": read_ndjson}
+
+
+def detect_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+async def run(path: str, file_format: str, batch_size: int) -> dict:
+    db = get_db()
+    file = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        importer = OrganizationImporter(db, batch_size=batch_size)
+        return await importer.run(READERS[file_format](file))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("file")
+    parser.add_argument(
+        "--format",
+        choices=sorted(READERS),
+        help="Input format, by default csv for *.csv files and ndjson otherwise.",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            asyncio.run(
+                run(args.file, args.format or detect_format(args.file), args.batch_size)
+            ),
+            indent=2,
+        )
+    )
@@ -1,14 +1,18 @@
-import asyncio
-
 import uvicorn
 
-from services.app.main import app
-
-
-async def run():
-    uvicorn_config = uvicorn.Config(app=app, host="0.0.0.0", port=8000)
-    server = uvicorn.Server(config=uvicorn_config)
-    await server.serve()
-
+from services.app.settings import settings
 
-asyncio.run(run())
+if __name__ == "__main__":
+    # With several workers uvicorn pre-forks them onto one listening socket.
+    # SIGHUP restarts them one at a time, each finishing its requests first.
+    # A single worker runs without that supervisor and SIGHUP stops it.
+    uvicorn.run(
+        "services.app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=settings.get_server_workers(),
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        reload=settings.SERVER_RELOAD,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
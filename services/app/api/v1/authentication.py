@@ -2,6 +2,7 @@ from typing import Annotated
 
 from fastapi import Depends, HTTPException, status
 
+from services.app.metrics import timed
 from services.backend import Backend, get_backend
 from services.backend.modules.auth.schemas import User
 
@@ -15,7 +16,8 @@ async def check_api_key(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Api key not provided."
         )
     try:
-        user = await backend.auth_module.get_current_user(api_key=api_key)
+        with timed("auth"):
+            user = await backend.auth_module.get_current_user(api_key=api_key)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e)
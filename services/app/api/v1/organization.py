@@ -1,13 +1,111 @@
-from typing import Annotated, List, Union
+from typing import Annotated, AsyncIterator, Hashable, List, Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from services.app.api.v1.authentication import check_api_key
+from services.app.metrics import TimedRoute
 from services.backend import Backend, get_backend
 from services.backend.modules.auth.schemas import User
-from services.backend.modules.organization.schemas import OrgFull
+from services.backend.modules.organization.module import (
+    DEFAULT_SIMILARITY_THRESHOLD,
+)
+from services.backend.modules.organization.pagination import (
+    DEFAULT_LIMIT,
+    MAX_LIMIT,
+    InvalidCursorError,
+)
+from services.backend.modules.organization.schemas import (
+    OrgBatchRequest,
+    OrgDocumentPage,
+    OrgFull,
+    OrgNearest,
+    OrgPage,
+)
+from services.backend.response_cache import Rendered
+
+router = APIRouter(prefix="/org", tags=["org"], route_class=TimedRoute)
+
+Limit = Annotated[int, Query(ge=1, le=MAX_LIMIT)]
+Cursor = Annotated[
+    Union[str, None],
+    Query(description="Value of the X-Next-Cursor header of the previous page."),
+]
+Stream = Annotated[
+    bool,
+    Query(
+        description="Stream every match as NDJSON, ignoring limit and cursor. "
+        "Same as sending Accept: application/x-ndjson."
+    ),
+]
+
+Documents = Annotated[
+    bool,
+    Query(
+        description="Serve pre-rendered organization documents. They are "
+        "refreshed periodically, so the latest changes may be missing."
+    ),
+]
+
+NDJSON = "application/x-ndjson"
+
+
+async def get_page(page_query) -> Union[OrgPage, OrgDocumentPage]:
+    try:
+        return await page_query
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from e
+
+
+async def paginate(response: Response, page_query) -> Union[List[OrgFull], Response]:
+    page = await get_page(page_query)
+    result = page.items
+    if isinstance(page, OrgDocumentPage):
+        result = response = documents_response(page.items)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return result
+
+
+def documents_response(documents: Union[List[Union[str, None]], str, None]) -> Response:
+    """Sends documents from ``org_document`` as they are, without re-encoding."""
+    if isinstance(documents, list):
+        content = "[" + ",".join(doc or "null" for doc in documents) + "]"
+    else:
+        content = documents or "null"
+    return Response(content, media_type="application/json")
+
+
+async def cached_json(
+    request: Request, backend: Backend, key: Hashable, render
+) -> Response:
+    """Response bytes from the response cache, or 304 when the ETag matches."""
+    cached = await backend.response_cache.get(key, render)
+    headers = {**cached.headers, "ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
 
-router = APIRouter(prefix="/org", tags=["org"])
+def etag_matches(if_none_match: Union[str, None], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    return stream or NDJSON in request.headers.get("accept", "")
+
+
+def ndjson_response(orgs: AsyncIterator[Union[OrgFull, str]]) -> StreamingResponse:
+    async def lines():
+        async for org in orgs:
+            yield (org if isinstance(org, str) else org.model_dump_json()) + "\n"
+
+    return StreamingResponse(lines(), media_type=NDJSON)
 
 
 @router.get(
@@ -18,7 +116,12 @@ async def get_by_coords(
     backend: Annotated[Backend, Depends(get_backend)],
     lon: float,
     lat: float,
+    documents: Documents = False,
 ):
+    if documents:
+        return documents_response(
+            await backend.org_module.get_by_coords(lon=lon, lat=lat, documents=True)
+        )
     return await backend.org_module.get_by_coords(lon=lon, lat=lat)
 
 
@@ -28,9 +131,37 @@ async def get_by_coords(
 async def get_by_id(
     user: Annotated[User, Depends(check_api_key)],
     backend: Annotated[Backend, Depends(get_backend)],
+    request: Request,
     org_id: int,
+    documents: Documents = False,
 ):
-    return await backend.org_module.get_by_id(org_id=org_id)
+    if documents:
+        return documents_response(
+            await backend.org_module.get_by_id(org_id=org_id, documents=True)
+        )
+
+    async def render() -> Rendered:
+        return await backend.org_module.get_by_id(org_id=org_id, fresh=True), {}
+
+    return await cached_json(request, backend, ("id", org_id), render)
+
+
+@router.post(
+    "/batch",
+    summary="Get organizations by ids, in the same order, null for unknown ids",
+    response_model=List[Union[OrgFull, None]],
+)
+async def get_by_ids(
+    user: Annotated[User, Depends(check_api_key)],
+    backend: Annotated[Backend, Depends(get_backend)],
+    body: OrgBatchRequest,
+    documents: Documents = False,
+):
+    if documents:
+        return documents_response(
+            await backend.org_module.get_by_ids(org_ids=body.ids, documents=True)
+        )
+    return await backend.org_module.get_by_ids(org_ids=body.ids)
 
 
 @router.get(
@@ -41,11 +172,42 @@ async def get_by_id(
 async def get_by_categories(
     user: Annotated[User, Depends(check_api_key)],
     backend: Annotated[Backend, Depends(get_backend)],
+    request: Request,
+    response: Response,
     cat_id: int,
+    limit: Limit = DEFAULT_LIMIT,
+    cursor: Cursor = None,
+    stream: Stream = False,
+    documents: Documents = False,
 ):
-    categories = await backend.cat_module.get_tree(cat_id=cat_id)
-    return await backend.org_module.get_by_categories(
-        cat_ids=[x.id for x in categories]
+    if wants_stream(request, stream):
+        cat_ids = await backend.cat_module.get_subtree_ids(cat_id=cat_id)
+        return ndjson_response(
+            backend.org_module.stream_by_categories(
+                cat_ids=cat_ids, documents=documents
+            )
+        )
+    if documents:
+        cat_ids = await backend.cat_module.get_subtree_ids(cat_id=cat_id)
+        return await paginate(
+            response,
+            backend.org_module.get_by_categories(
+                cat_ids=cat_ids, limit=limit, cursor=cursor, documents=True
+            ),
+        )
+
+    async def render() -> Rendered:
+        cat_ids = await backend.cat_module.get_subtree_ids(cat_id=cat_id)
+        page = await get_page(
+            backend.org_module.get_by_categories(
+                cat_ids=cat_ids, limit=limit, cursor=cursor, fresh=True
+            )
+        )
+        headers = {"X-Next-Cursor": page.next_cursor} if page.next_cursor else {}
+        return page.items, headers
+
+    return await cached_json(
+        request, backend, ("category", cat_id, limit, cursor), render
     )
 
 
@@ -57,9 +219,50 @@ async def get_by_categories(
 async def get_by_name(
     user: Annotated[User, Depends(check_api_key)],
     backend: Annotated[Backend, Depends(get_backend)],
+    request: Request,
+    response: Response,
     name: str,
+    limit: Limit = DEFAULT_LIMIT,
+    cursor: Cursor = None,
+    stream: Stream = False,
+    documents: Documents = False,
 ):
-    return await backend.org_module.get_by_name(name=name)
+    if wants_stream(request, stream):
+        return ndjson_response(
+            backend.org_module.stream_by_name(name=name, documents=documents)
+        )
+    return await paginate(
+        response,
+        backend.org_module.get_by_name(
+            name=name, limit=limit, cursor=cursor, documents=documents
+        ),
+    )
+
+
+@router.get(
+    "/name/similar",
+    summary="Get organizations with names similar to the given one, best match first.",
+    response_model=List[OrgFull],
+)
+async def get_by_similarity(
+    user: Annotated[User, Depends(check_api_key)],
+    backend: Annotated[Backend, Depends(get_backend)],
+    name: str,
+    threshold: Annotated[
+        float, Query(gt=0, le=1, description="Minimal trigram similarity.")
+    ] = DEFAULT_SIMILARITY_THRESHOLD,
+    limit: Limit = DEFAULT_LIMIT,
+    documents: Documents = False,
+):
+    if documents:
+        return documents_response(
+            await backend.org_module.get_by_similarity(
+                name=name, threshold=threshold, limit=limit, documents=True
+            )
+        )
+    return await backend.org_module.get_by_similarity(
+        name=name, threshold=threshold, limit=limit
+    )
 
 
 @router.get(
@@ -70,13 +273,122 @@ async def get_by_radius(
     backend: Annotated[Backend, Depends(get_backend)],
     lon: float,
     lat: float,
+    request: Request,
+    response: Response,
     radius_meters: int,
+    limit: Limit = DEFAULT_LIMIT,
+    cursor: Cursor = None,
+    stream: Stream = False,
+    documents: Documents = False,
+):
+    if wants_stream(request, stream):
+        return ndjson_response(
+            backend.org_module.stream_by_radius(
+                lon=lon, lat=lat, radius_meters=radius_meters, documents=documents
+            )
+        )
+    return await paginate(
+        response,
+        backend.org_module.get_by_radius(
+            lon=lon,
+            lat=lat,
+            radius_meters=radius_meters,
+            limit=limit,
+            cursor=cursor,
+            documents=documents,
+        ),
+    )
+
+
+@router.get(
+    "/search",
+    summary="Get organizations matching all given filters: radius or area, category tree and name.",
+    response_model=List[OrgFull],
+)
+async def search(
+    user: Annotated[User, Depends(check_api_key)],
+    backend: Annotated[Backend, Depends(get_backend)],
+    request: Request,
+    response: Response,
+    lon: Union[float, None] = None,
+    lat: Union[float, None] = None,
+    radius_meters: Union[int, None] = None,
+    height: Union[int, None] = None,
+    width: Union[int, None] = None,
+    cat_id: Union[int, None] = None,
+    name: Annotated[
+        Union[str, None], Query(description='"%" wildcard is supported.')
+    ] = None,
+    limit: Limit = DEFAULT_LIMIT,
+    cursor: Cursor = None,
+    stream: Stream = False,
+    documents: Documents = False,
 ):
-    return await backend.org_module.get_by_radius(
-        lon=lon, lat=lat, radius_meters=radius_meters
+    area = height is not None or width is not None
+    if radius_meters is not None and area:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search by either radius or area, not both.",
+        )
+    if (radius_meters is not None or area) and (
+        lon is None or lat is None or (area and (height is None or width is None))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Radius needs lon, lat and radius_meters, "
+            "area needs lon, lat, height and width.",
+        )
+    if (lon is not None or lat is not None) and radius_meters is None and not area:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="lon and lat need radius_meters, or height and width.",
+        )
+    if radius_meters is None and not area and cat_id is None and name is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one filter is required.",
+        )
+    filters = dict(
+        lon=lon,
+        lat=lat,
+        radius_meters=radius_meters,
+        height=height,
+        width=width,
+        name=name,
+    )
+    if cat_id is not None:
+        filters["cat_ids"] = await backend.cat_module.get_subtree_ids(cat_id=cat_id)
+    if wants_stream(request, stream):
+        return ndjson_response(
+            backend.org_module.stream_by_filters(**filters, documents=documents)
+        )
+    return await paginate(
+        response,
+        backend.org_module.get_by_filters(
+            **filters, limit=limit, cursor=cursor, documents=documents
+        ),
     )
 
 
+@router.get(
+    "/nearest",
+    summary="Get the k organizations nearest to the coords, optionally only of a category tree.",
+    response_model=List[OrgNearest],
+)
+async def get_nearest(
+    user: Annotated[User, Depends(check_api_key)],
+    backend: Annotated[Backend, Depends(get_backend)],
+    lon: float,
+    lat: float,
+    k: Limit = 10,
+    cat_id: Union[int, None] = None,
+):
+    cat_ids = None
+    if cat_id is not None:
+        cat_ids = await backend.cat_module.get_subtree_ids(cat_id=cat_id)
+    return await backend.org_module.get_nearest(lon=lon, lat=lat, k=k, cat_ids=cat_ids)
+
+
 @router.get(
     "/area",
     summary="Get organizations inside area. The parameters are the coordinates of the center and the width and height of the area, measured in meters.",
@@ -88,8 +400,29 @@ async def get_by_area(
     lon: float,
     lat: float,
     height: int,
+    request: Request,
+    response: Response,
     width: int,
+    limit: Limit = DEFAULT_LIMIT,
+    cursor: Cursor = None,
+    stream: Stream = False,
+    documents: Documents = False,
 ):
-    return await backend.org_module.get_by_area(
-        lon=lon, lat=lat, height=height, width=width
+    if wants_stream(request, stream):
+        return ndjson_response(
+            backend.org_module.stream_by_area(
+                lon=lon, lat=lat, height=height, width=width, documents=documents
+            )
+        )
+    return await paginate(
+        response,
+        backend.org_module.get_by_area(
+            lon=lon,
+            lat=lat,
+            height=height,
+            width=width,
+            limit=limit,
+            cursor=cursor,
+            documents=documents,
+        ),
     )
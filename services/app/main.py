@@ -1,9 +1,24 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from services.app.metrics import Gauges, MetricsMiddleware, render_metrics
+from services.backend import get_backend
 
 from .api import router as api_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    backend = get_backend()
+    await backend.startup()
+    yield
+    await backend.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(api_router)
 app.add_middleware(
     CORSMiddleware,
@@ -11,4 +26,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+def pool_stats() -> dict:
+    pool = get_backend().db.engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
+def cache_stats() -> dict:
+    backend = get_backend()
+    stats = {
+        "auth": backend.auth_module.cache_stats(),
+        "response": backend.response_cache.stats(),
+        "single_flight": backend.org_module.single_flight.stats(),
+    }
+    if backend.org_module.spatial is not None:
+        stats["spatial"] = backend.org_module.spatial.stats()
+    return {
+        f"{cache}_{name}": value
+        for cache, values in stats.items()
+        for name, value in values.items()
+    }
+
+
+Gauges("db_pool", pool_stats)
+Gauges("cache", cache_stats)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,281 @@
+"""In-process request and database metrics.
+
+``RequestStats`` of the current request live in a context variable: the
+SQLAlchemy greenlet bridge and the tasks started for a request copy the
+context, so engine events and the pool see the stats object of the request
+they run for. Metrics go to Prometheus-style histograms rendered by
+``render_metrics``, per-request numbers also to the ``Server-Timing`` header.
+
+Queries coalesced by single-flight are counted for the request that ran them.
+"""
+
+import bisect
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, **extra) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        # Per label set: count per bucket (the last one is +Inf), and the sum.
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(labels, le=bound)} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Gauges:
+    """Current values read from ``collect`` whenever metrics are rendered."""
+
+    def __init__(self, prefix: str, collect: Callable[[], Dict[str, float]]):
+        self.prefix = prefix
+        self.collect = collect
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        lines = []
+        for name, value in self.collect().items():
+            lines.append(f"# TYPE {self.prefix}_{name} gauge")
+            lines.append(f"{self.prefix}_{name} {float(value)}")
+        return lines
+
+
+REGISTRY: List[Union[Histogram, Gauges]] = []
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to the start of the response."
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent executing queries per request."
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Queries executed per request.", COUNT_BUCKETS
+)
+REQUEST_POOL_WAIT_SECONDS = Histogram(
+    "http_request_pool_wait_seconds", "Time spent getting connections per request."
+)
+REQUEST_SERIALIZATION_SECONDS = Histogram(
+    "http_request_serialization_seconds",
+    "Time from the endpoint's return to the encoded response.",
+)
+QUERY_SECONDS = Histogram("db_query_duration_seconds", "Duration of single queries.")
+POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Time to get a connection from the pool."
+)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "pool_wait_seconds", "timings", "returned_at")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.timings: Dict[str, float] = {}
+        self.returned_at: Union[float, None] = None
+
+    def add(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        parts = [
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f"pool;dur={self.pool_wait_seconds * 1000:.2f}",
+            *(
+                f"{name};dur={seconds * 1000:.2f}"
+                for name, seconds in self.timings.items()
+            ),
+            f"total;dur={total_seconds * 1000:.2f}",
+        ]
+        return ", ".join(parts)
+
+
+request_stats: ContextVar[Union[RequestStats, None]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Adds the time spent in the block to the current request's ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = request_stats.get()
+        if stats is not None:
+            stats.add(name, time.perf_counter() - start)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool that records how long each checkout waited."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            seconds = time.perf_counter() - start
+            POOL_WAIT_SECONDS.observe(seconds)
+            stats = request_stats.get()
+            if stats is not None:
+                stats.pool_wait_seconds += seconds
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Times every query executed through the engine."""
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        seconds = time.perf_counter() - conn.info["query_start"].pop()
+        QUERY_SECONDS.observe(seconds)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += seconds
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+class TimedRoute(APIRoute):
+    """Route recording how long the response takes after the endpoint returns.
+
+    That is response model validation and JSON encoding, reported as
+    ``serialize``.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kw):
+            try:
+                return await endpoint(*args, **kw)
+            finally:
+                stats = request_stats.get()
+                if stats is not None:
+                    stats.returned_at = time.perf_counter()
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = request_stats.get()
+            if stats is not None and stats.returned_at is not None:
+                stats.add("serialize", time.perf_counter() - stats.returned_at)
+            return response
+
+        return timed_handler
+
+
+class MetricsMiddleware:
+    """Collects ``RequestStats`` per HTTP request and adds ``Server-Timing``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                seconds = time.perf_counter() - start
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", stats.server_timing(seconds).encode()),
+                ]
+                self._observe(scope, message["status"], seconds, stats)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_stats.reset(token)
+
+    @staticmethod
+    def _observe(scope, status: int, seconds: float, stats: RequestStats):
+        route = scope.get("route")
+        # Route templates, not raw paths, so the number of series stays bounded.
+        path = getattr(route, "path", "unmatched")
+        REQUEST_SECONDS.observe(
+            seconds, method=scope["method"], route=path, status=str(status)
+        )
+        REQUEST_DB_SECONDS.observe(stats.db_seconds, route=path)
+        REQUEST_QUERIES.observe(stats.queries, route=path)
+        REQUEST_POOL_WAIT_SECONDS.observe(stats.pool_wait_seconds, route=path)
+        if "serialize" in stats.timings:
+            REQUEST_SERIALIZATION_SECONDS.observe(
+                stats.timings["serialize"], route=path
+            )
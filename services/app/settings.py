@@ -1,3 +1,6 @@
+import os
+from typing import List, Literal, Tuple, Union
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,6 +11,25 @@ class DatabaseSettings(BaseSettings):
     DB_USER: str = ""
     DB_PASS: str = ""
 
+    DB_POOL_SIZE: int = 50
+    DB_MAX_OVERFLOW: int = 100
+    DB_POOL_RECYCLE: int = 60 * 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_PRE_PING: bool = False
+    # Connections all server workers together may open to each database, 0
+    # means no limit. Each worker's pool is shrunk to its share of it.
+    DB_MAX_CONNECTIONS: int = 0
+    DB_CONNECT_TIMEOUT: float = 10
+    DB_COMMAND_TIMEOUT: Union[float, None] = None
+    # Prepared statements kept per connection by the asyncpg dialect, 0 disables.
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500
+
+    # Comma separated SQLAlchemy URLs of read replicas.
+    DB_REPLICA_URLS: str = ""
+    DB_REPLICA_SELECTION: Literal["round_robin", "least_loaded"] = "round_robin"
+    DB_REPLICA_MAX_LAG: float = 5
+    DB_REPLICA_CHECK_INTERVAL: float = 1
+
     model_config = SettingsConfigDict(
         env_file=".env", frozen=True, env_ignore_empty=True
     )
@@ -15,9 +37,93 @@ class DatabaseSettings(BaseSettings):
     def get_db_url(self) -> str:
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    def get_replica_urls(self) -> List[str]:
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
+
+class AuthSettings(BaseSettings):
+    AUTH_CACHE_SIZE: int = 10_000
+    AUTH_CACHE_TTL: float = 60
+    # Unknown keys are cached apart, so guessing keys cannot evict valid ones.
+    AUTH_CACHE_NEGATIVE_SIZE: int = 1_000
+    AUTH_CACHE_NEGATIVE_TTL: float = 5
+
+    model_config = SettingsConfigDict(
+        env_file=".env", frozen=True, env_ignore_empty=True
+    )
+
+
+class SpatialIndexSettings(BaseSettings):
+    # Keep every organization's coordinates in memory for geo searches.
+    SPATIAL_INDEX_ENABLED: bool = False
+    # Seconds between applying address changes to the index.
+    SPATIAL_INDEX_REFRESH_INTERVAL: float = 1
+
+    model_config = SettingsConfigDict(
+        env_file=".env", frozen=True, env_ignore_empty=True
+    )
+
+
+class DocumentSettings(BaseSettings):
+    # Seconds between refreshes of the org_document view, 0 disables them.
+    ORG_DOCUMENTS_REFRESH_INTERVAL: float = 60
+
+    model_config = SettingsConfigDict(
+        env_file=".env", frozen=True, env_ignore_empty=True
+    )
+
+
+class ResponseCacheSettings(BaseSettings):
+    RESPONSE_CACHE_SIZE: int = 10_000
+    # Upper bound on staleness should a change notification get lost.
+    RESPONSE_CACHE_TTL: float = 300
+
+    model_config = SettingsConfigDict(
+        env_file=".env", frozen=True, env_ignore_empty=True
+    )
+
+
+class ServerSettings(BaseSettings):
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # Worker processes, 0 starts one per CPU core.
+    SERVER_WORKERS: int = 1
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    # Restart on code changes, for development. Runs a single worker.
+    SERVER_RELOAD: bool = False
+    SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: float = 30
+
+    model_config = SettingsConfigDict(
+        env_file=".env", frozen=True, env_ignore_empty=True
+    )
+
+    def get_server_workers(self) -> int:
+        return self.SERVER_WORKERS or os.cpu_count() or 1
+
 
-class Settings(DatabaseSettings):
-    pass
+class Settings(
+    ServerSettings,
+    DatabaseSettings,
+    AuthSettings,
+    SpatialIndexSettings,
+    DocumentSettings,
+    ResponseCacheSettings,
+):
+    def get_pool_limits(self) -> Tuple[int, int]:
+        """``pool_size`` and ``max_overflow`` of one worker's pool."""
+        if not self.DB_MAX_CONNECTIONS:
+            return self.DB_POOL_SIZE, self.DB_MAX_OVERFLOW
+        workers = self.get_server_workers()
+        # One connection per worker is kept for LISTEN, outside the pool.
+        share = self.DB_MAX_CONNECTIONS // workers - 1
+        if share < 1:
+            raise ValueError(
+                f"DB_MAX_CONNECTIONS={self.DB_MAX_CONNECTIONS} is too low for "
+                f"{workers} workers, at least {2 * workers} are needed."
+            )
+        pool_size = min(self.DB_POOL_SIZE, share)
+        return pool_size, max(0, min(self.DB_MAX_OVERFLOW, share - pool_size))
 
 
 settings = Settings()
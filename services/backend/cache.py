@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Tuple, TypeVar, Union
+
+V = TypeVar("V")
+
+MISSING = object()
+
+
+class TtlLruCache(Generic[V]):
+    """Bounded LRU cache whose entries also expire after a time-to-live.
+
+    ``None`` is a valid cached value, use ``MISSING`` as the ``get`` default
+    to tell a cached ``None`` from a miss.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[Hashable, Tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable, default=None) -> Union[V, object, None]:
+        item = self._items.get(key)
+        if item is None or item[0] <= self.clock():
+            if item is not None:
+                del self._items[key]
+            self.misses += 1
+            return default
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: V, ttl: Union[float, None] = None):
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        self._items[key] = (expires_at, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._items.pop(key, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,16 +1,91 @@
+import asyncio
 from functools import lru_cache
+from typing import Union
+
+from services.app.logger import logger
+from services.app.settings import settings
 
 from services.backend.modules.auth.module import AuthModule
 from services.backend.modules.category.module import CategoryModule
 from services.backend.modules.organization.module import OrganizationModule
+from services.backend.response_cache import ResponseCache
 from services.db import Db, get_db
 
+# Advisory lock of the process that refreshes org_document for all of them.
+DOCUMENTS_REFRESH_LOCK = 7_301_442_915
+
 
 class Backend:
     def __init__(self, db: Db):
+        self.db = db
         self.org_module = OrganizationModule(db=db)
         self.cat_module = CategoryModule(db=db)
         self.auth_module = AuthModule(db=db)
+        self.response_cache = ResponseCache(
+            max_size=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL
+        )
+        self._documents_refresher: Union[asyncio.Task, None] = None
+        self._spatial_refresher: Union[asyncio.Task, None] = None
+
+    async def startup(self):
+        await self.db.start()
+        # Listening first, a change made while the index loads marks it stale.
+        await self.db.listen(
+            "category_changed", lambda payload: self.cat_module.invalidate()
+        )
+        await self.cat_module.get_index()
+        await self.db.listen(
+            "api_key_changed", lambda payload: self.auth_module.invalidate()
+        )
+        if self.org_module.spatial is not None:
+            await self.db.listen(
+                "address_changed", self.org_module.spatial.invalidate_payload
+            )
+            await self.org_module.refresh_spatial_index()
+            self._spatial_refresher = asyncio.get_running_loop().create_task(
+                self._refresh_spatial_index()
+            )
+        for channel in (
+            "category_changed",
+            "address_changed",
+            "organization_changed",
+        ):
+            await self.db.listen(channel, self.response_cache.invalidate)
+            await self.db.listen(channel, self.org_module.invalidate_documents)
+        if settings.ORG_DOCUMENTS_REFRESH_INTERVAL > 0:
+            self._documents_refresher = asyncio.get_running_loop().create_task(
+                self._refresh_documents()
+            )
+
+    async def shutdown(self):
+        if self._documents_refresher is not None:
+            self._documents_refresher.cancel()
+            self._documents_refresher = None
+        if self._spatial_refresher is not None:
+            self._spatial_refresher.cancel()
+            self._spatial_refresher = None
+        await self.db.close()
+
+    async def _refresh_documents(self):
+        while True:
+            await asyncio.sleep(settings.ORG_DOCUMENTS_REFRESH_INTERVAL)
+            if not self.org_module.documents_dirty:
+                continue
+            try:
+                if await self.db.try_advisory_lock(DOCUMENTS_REFRESH_LOCK):
+                    await self.org_module.refresh_documents()
+            except Exception as e:
+                logger.exception(e)
+
+    async def _refresh_spatial_index(self):
+        while True:
+            await asyncio.sleep(settings.SPATIAL_INDEX_REFRESH_INTERVAL)
+            if not self.org_module.spatial.dirty:
+                continue
+            try:
+                await self.org_module.refresh_spatial_index()
+            except Exception as e:
+                logger.exception(e)
 
 
 @lru_cache
@@ -3,23 +3,75 @@ from typing import Union
 
 from sqlalchemy import select
 
+from services.app.settings import settings
+from services.backend.cache import MISSING, TtlLruCache
 from services.backend.modules.auth.schemas import User
 from services.backend.modules.base import ModuleWithDb
+from services.db import Db
 from services.db.models import ApiKey
 
 
 class AuthModule(ModuleWithDb):
+    def __init__(self, db: Db):
+        super().__init__(db=db)
+        self.cache: TtlLruCache[User] = TtlLruCache(
+            max_size=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL
+        )
+        # Unknown keys are remembered briefly, so brute-forcing does not reach
+        # the database, while a newly issued key starts working soon enough.
+        # They have a cache of their own, so they cannot evict valid keys.
+        self.negative_cache: TtlLruCache[None] = TtlLruCache(
+            max_size=settings.AUTH_CACHE_NEGATIVE_SIZE,
+            ttl=settings.AUTH_CACHE_NEGATIVE_TTL,
+        )
+        # Bumped by every invalidation, a lookup that ran across one is not
+        # cached: the key may have been revoked or issued meanwhile.
+        self.version = 0
+
     async def get_current_user(self, api_key: str) -> Union[User, None]:
-        query = select(ApiKey).where(ApiKey.api_key == self.hash_api_key(api_key))
-        async with self.db.session_scope() as sess:
+        api_key_hash = self.hash_api_key(api_key)
+        result = self.cache.get(api_key_hash, MISSING)
+        if result is MISSING:
+            result = self.negative_cache.get(api_key_hash, MISSING)
+        if result is not MISSING:
+            return result
+
+        version = self.version
+        query = select(ApiKey).where(ApiKey.api_key == api_key_hash)
+        async with self.db.read_session_scope(use_replica=False) as sess:
             user = await sess.execute(query)
             user = user.scalar_one_or_none()
             if user:
                 result = User(id=user.user_id)
             else:
                 result = None
+        if version != self.version:
+            return result
+        if result:
+            self.cache.set(api_key_hash, result)
+        else:
+            self.negative_cache.set(api_key_hash, None)
         return result
 
+    def invalidate(self, api_key: Union[str, None] = None):
+        """Drops a revoked key from the cache, or the whole cache without a key."""
+        self.version += 1
+        if api_key is None:
+            self.cache.clear()
+            self.negative_cache.clear()
+        else:
+            self.cache.pop(self.hash_api_key(api_key))
+            self.negative_cache.pop(self.hash_api_key(api_key))
+
+    def cache_stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            **{
+                f"negative_{name}": value
+                for name, value in self.negative_cache.stats().items()
+            },
+        }
+
     @staticmethod
     def hash_api_key(api_key: str) -> str:
         return hashlib.sha256(api_key.encode()).hexdigest()
@@ -1,6 +1,8 @@
+from services.backend.singleflight import SingleFlight
 from services.db import Db
 
 
 class ModuleWithDb:
     def __init__(self, db: Db):
         self.db = db
+        self.single_flight = SingleFlight()
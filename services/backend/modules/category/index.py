@@ -0,0 +1,52 @@
+from typing import Dict, Iterable, List
+
+from services.backend.modules.category.schemas import CategoryFull
+
+
+class CategoryIndex:
+    """Immutable in-memory snapshot of the category tree.
+
+    Categories are laid out in DFS preorder, so the subtree of any category is
+    the contiguous slice ``order[enter[id]:leave[id]]`` (Euler-tour intervals).
+    """
+
+    def __init__(self, categories: Iterable[CategoryFull]):
+        self.categories: Dict[int, CategoryFull] = {cat.id: cat for cat in categories}
+        self.children: Dict[int, List[int]] = {}
+        for cat in sorted(self.categories.values(), key=lambda x: x.id):
+            if cat.parent_id is not None and cat.parent_id in self.categories:
+                self.children.setdefault(cat.parent_id, []).append(cat.id)
+
+        self.order: List[CategoryFull] = []
+        self.enter: Dict[int, int] = {}
+        self.leave: Dict[int, int] = {}
+        roots = [
+            cat_id
+            for cat_id, cat in sorted(self.categories.items())
+            if cat.parent_id is None or cat.parent_id not in self.categories
+        ]
+        for root in roots:
+            self._walk(root)
+
+    def _walk(self, root: int):
+        stack = [(root, False)]
+        while stack:
+            cat_id, visited = stack.pop()
+            if visited:
+                self.leave[cat_id] = len(self.order)
+                continue
+            if cat_id in self.enter:
+                continue
+            self.enter[cat_id] = len(self.order)
+            self.order.append(self.categories[cat_id])
+            stack.append((cat_id, True))
+            for child in reversed(self.children.get(cat_id, [])):
+                stack.append((child, False))
+
+    def subtree(self, cat_id: int) -> List[CategoryFull]:
+        if cat_id not in self.enter:
+            return []
+        return self.order[self.enter[cat_id] : self.leave[cat_id]]
+
+    def subtree_ids(self, cat_id: int) -> List[int]:
+        return [cat.id for cat in self.subtree(cat_id)]
@@ -1,41 +1,49 @@
-from typing import List
+import asyncio
+from typing import List, Union
 
 from sqlalchemy import select
 
 from services.backend.modules.base import ModuleWithDb
+from services.backend.modules.category.index import CategoryIndex
 from services.backend.modules.category.schemas import CategoryFull
+from services.db import Db
 from services.db.models import Category
 
 
 class CategoryModule(ModuleWithDb):
-    async def get_tree(self, cat_id) -> List[CategoryFull]:
-        query = select(Category).where(Category.id == cat_id)
-        result = []
-        result_ids = set()
-        cur_cats = []
-        async with self.db.session_scope() as sess:
-            category = await sess.execute(query)
-            category = category.scalar_one_or_none()
-            if category:
-                result.append(
-                    CategoryFull(
-                        id=category.id, parent_id=category.parent_id, name=category.name
-                    )
-                )
-                cur_cats.append(category.id)
-                result_ids.add(category.id)
-            while cur_cats:
-                query = select(Category).where(Category.parent_id.in_(cur_cats))
-                categories = await sess.execute(query)
-                categories = categories.scalars().all()
-                cur_cats = []
-                for cat in categories:
-                    if cat.id not in result_ids:
-                        result.append(
-                            CategoryFull(
-                                id=cat.id, parent_id=cat.parent_id, name=cat.name
-                            )
-                        )
-                        cur_cats.append(cat.id)
-                        result_ids.add(cat.id)
+    def __init__(self, db: Db):
+        super().__init__(db=db)
+        self.version = 0
+        self._index: Union[CategoryIndex, None] = None
+        self._index_version = -1
+        self._index_lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Marks the in-memory tree as stale, it is reloaded on next access."""
+        self.version += 1
+
+    async def get_index(self) -> CategoryIndex:
+        if self._index is None or self._index_version != self.version:
+            async with self._index_lock:
+                if self._index is None or self._index_version != self.version:
+                    version = self.version
+                    self._index = await self.load_index()
+                    self._index_version = version
+        return self._index
+
+    async def load_index(self) -> CategoryIndex:
+        async with self.db.read_session_scope(use_replica=False) as sess:
+            categories = await sess.execute(select(Category))
+            result = CategoryIndex(
+                CategoryFull(id=cat.id, parent_id=cat.parent_id, name=cat.name)
+                for cat in categories.scalars()
+            )
         return result
+
+    async def get_tree(self, cat_id: int) -> List[CategoryFull]:
+        index = await self.get_index()
+        return index.subtree(cat_id)
+
+    async def get_subtree_ids(self, cat_id: int) -> List[int]:
+        index = await self.get_index()
+        return index.subtree_ids(cat_id)
@@ -0,0 +1,107 @@
+import numpy as np
+
+# WGS 84, the spheroid PostGIS uses for SRID 4326 geography.
+WGS84_A = 6_378_137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+MAX_ITERATIONS = 999
+
+
+def project(lons, lats, distances, azimuths):
+    """Vectorized Vincenty direct problem on WGS 84, like ``ST_Project`` on geography.
+
+    Follows PostGIS' ``spheroid_project`` step by step, so envelopes computed
+    here match the ones the database would build. Coordinates are in degrees,
+    distances in meters and azimuths in radians clockwise from north.
+    """
+    lon1 = np.radians(np.asarray(lons, dtype=np.float64))
+    lat1 = np.radians(np.asarray(lats, dtype=np.float64))
+    distances = np.asarray(distances, dtype=np.float64)
+    azimuths = np.mod(np.asarray(azimuths, dtype=np.float64), 2 * np.pi)
+
+    omf = 1 - WGS84_F
+    tan_u1 = omf * np.tan(lat1)
+    u1 = np.arctan(tan_u1)
+    sigma1 = np.arctan2(tan_u1, np.cos(azimuths))
+    sin_alpha = np.cos(u1) * np.sin(azimuths)
+    cos_alpha_sq = 1 - sin_alpha**2
+    u_sq = cos_alpha_sq * (WGS84_A**2 - WGS84_B**2) / WGS84_B**2
+    big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+
+    sigma_0 = distances / (WGS84_B * big_a)
+    sigma = sigma_0.copy()
+    active = np.ones_like(sigma, dtype=bool)
+    two_sigma_m = 2 * sigma1 + sigma
+    for _ in range(MAX_ITERATIONS):
+        two_sigma_m = np.where(active, 2 * sigma1 + sigma, two_sigma_m)
+        cos_2sm = np.cos(two_sigma_m)
+        delta_sigma = (
+            big_b
+            * np.sin(sigma)
+            * (
+                cos_2sm
+                + big_b
+                / 4
+                * (
+                    np.cos(sigma) * (-1 + 2 * cos_2sm**2)
+                    - big_b
+                    / 6
+                    * cos_2sm
+                    * (-3 + 4 * np.sin(sigma) ** 2)
+                    * (-3 + 4 * cos_2sm**2)
+                )
+            )
+        )
+        last_sigma = sigma
+        sigma = np.where(active, sigma_0 + delta_sigma, sigma)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            active &= np.abs((last_sigma - sigma) / sigma) > 1e-9
+        if not active.any():
+            break
+
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+    cos_az = np.cos(azimuths)
+    lat2 = np.arctan2(
+        sin_u1 * cos_sigma + cos_u1 * sin_sigma * cos_az,
+        omf
+        * np.sqrt(
+            sin_alpha**2 + (sin_u1 * sin_sigma - cos_u1 * cos_sigma * cos_az) ** 2
+        ),
+    )
+    lam = np.arctan2(
+        sin_sigma * np.sin(azimuths), cos_u1 * cos_sigma - sin_u1 * sin_sigma * cos_az
+    )
+    c = WGS84_F / 16 * cos_alpha_sq * (4 + WGS84_F * (4 - 3 * cos_alpha_sq))
+    cos_2sm = np.cos(two_sigma_m)
+    omega = lam - (1 - c) * WGS84_F * sin_alpha * (
+        sigma + c * sin_sigma * (cos_2sm + c * cos_sigma * (-1 + 2 * cos_2sm**2))
+    )
+    lon2 = np.degrees(lon1 + omega)
+    lon2 = (lon2 + 180) % 360 - 180
+    return np.where(distances == 0, np.degrees(lon1), lon2), np.where(
+        distances == 0, np.degrees(lat1), np.degrees(lat2)
+    )
+
+
+def area_envelope(lon: float, lat: float, height: float, width: float):
+    """``(west, south, east, north)`` of the search area around the center.
+
+    Same construction as the SQL it replaces: go half the height north and
+    south, then half the width east from the north point and west from the
+    south one.
+    """
+    ns_lons, ns_lats = project(
+        [lon, lon], [lat, lat], [height / 2, height / 2], [0, np.pi]
+    )
+    corner_lons, corner_lats = project(
+        ns_lons, ns_lats, [width / 2, width / 2], [np.pi / 2, 3 * np.pi / 2]
+    )
+    return (
+        float(corner_lons[1]),
+        float(corner_lats[1]),
+        float(corner_lons[0]),
+        float(corner_lats[0]),
+    )
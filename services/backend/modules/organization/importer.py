@@ -0,0 +1,330 @@
+import asyncio
+import csv
+import itertools
+import json
+import time
+from typing import IO, Iterable, Iterator, List, Tuple, Union
+
+from sqlalchemy import text
+
+from services.app.logger import logger
+from services.db import Db
+
+DEFAULT_BATCH_SIZE = 10_000
+
+# Separator of the phones and categories columns in CSV input.
+CSV_LIST_SEPARATOR = ";"
+
+ORGANIZATION_COLUMNS = (
+    "seq",
+    "id",
+    "name",
+    "lon",
+    "lat",
+    "country",
+    "city",
+    "street",
+    "home",
+)
+ADDRESS_FIELDS = ("country", "city", "street", "home")
+
+# Staging tables live as long as the connection and empty on every commit.
+STAGING_TABLES = (
+    """
+    CREATE TEMP TABLE IF NOT EXISTS import_organization (
+        seq INT PRIMARY KEY,
+        id INT,
+        name TEXT NOT NULL,
+        lon DOUBLE PRECISION NOT NULL,
+        lat DOUBLE PRECISION NOT NULL,
+        country TEXT NOT NULL,
+        city TEXT NOT NULL,
+        street TEXT NOT NULL,
+        home TEXT NOT NULL
+    ) ON COMMIT DELETE ROWS
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS import_phone (
+        seq INT NOT NULL,
+        number TEXT NOT NULL
+    ) ON COMMIT DELETE ROWS
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS import_category (
+        seq INT NOT NULL,
+        cat_id INT NOT NULL
+    ) ON COMMIT DELETE ROWS
+    """,
+)
+
+# Moves the organization sequence past every existing and staged id. It is
+# never moved back, so ids of deleted organizations are not handed out again.
+SYNC_SEQUENCE = """
+    SELECT setval(
+        seq,
+        GREATEST(
+            (SELECT max(id) FROM organization),
+            (SELECT max(id) FROM import_organization),
+            pg_sequence_last_value(seq::regclass),
+            1
+        )
+    )
+    FROM (SELECT pg_get_serial_sequence('organization', 'id') AS seq) AS s
+"""
+
+# Applied to each staged batch in order, within its transaction. The
+# geography is built here from lon/lat, so an equal point compares equal to
+# the one stored in address.coordinates.
+UPSERTS = (
+    # Explicit ids of this batch and earlier ones may be ahead of the
+    # sequence, the ids assigned next must not collide with them.
+    (None, SYNC_SEQUENCE),
+    (
+        None,
+        "UPDATE import_organization "
+        "SET id = nextval(pg_get_serial_sequence('organization', 'id')) "
+        "WHERE id IS NULL",
+    ),
+    # The last record of an organization wins.
+    (
+        "duplicates",
+        "DELETE FROM import_organization AS s USING import_organization AS t "
+        "WHERE s.id = t.id AND s.seq < t.seq",
+    ),
+    (
+        "addresses",
+        """
+        INSERT INTO address (coordinates, country, city, street, home)
+        SELECT DISTINCT ON (coordinates) coordinates, country, city, street, home
+        FROM (
+            SELECT ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography
+                AS coordinates, country, city, street, home, seq
+            FROM import_organization
+        ) AS s
+        ORDER BY coordinates, seq DESC
+        ON CONFLICT (coordinates) DO UPDATE
+        SET country = EXCLUDED.country, city = EXCLUDED.city,
+            street = EXCLUDED.street, home = EXCLUDED.home
+        WHERE (address.country, address.city, address.street, address.home)
+            IS DISTINCT FROM
+            (EXCLUDED.country, EXCLUDED.city, EXCLUDED.street, EXCLUDED.home)
+        """,
+    ),
+    (
+        "organizations",
+        """
+        INSERT INTO organization (id, name, address_id)
+        SELECT s.id, s.name, a.id
+        FROM import_organization AS s
+        JOIN address AS a
+            ON a.coordinates = ST_SetSRID(ST_MakePoint(s.lon, s.lat), 4326)::geography
+        ON CONFLICT (id) DO UPDATE
+        SET name = EXCLUDED.name, address_id = EXCLUDED.address_id
+        WHERE (organization.name, organization.address_id)
+            IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.address_id)
+        """,
+    ),
+    (
+        "unknown_categories",
+        "SELECT count(*) FROM import_category AS c "
+        "WHERE NOT EXISTS (SELECT 1 FROM category WHERE id = c.cat_id)",
+    ),
+    # Categories and phones of an imported organization are replaced by the
+    # ones of its record.
+    (
+        "categories_removed",
+        """
+        DELETE FROM organization_category AS oc
+        USING import_organization AS s
+        WHERE oc.org_id = s.id AND NOT EXISTS (
+            SELECT 1 FROM import_category AS c
+            WHERE c.seq = s.seq AND c.cat_id = oc.cat_id
+        )
+        """,
+    ),
+    (
+        "categories",
+        """
+        INSERT INTO organization_category (org_id, cat_id)
+        SELECT DISTINCT s.id, c.cat_id
+        FROM import_category AS c
+        JOIN import_organization AS s USING (seq)
+        JOIN category ON category.id = c.cat_id
+        ON CONFLICT DO NOTHING
+        """,
+    ),
+    (
+        "phones_removed",
+        """
+        DELETE FROM phone_number AS p
+        USING import_organization AS s
+        WHERE p.org_id = s.id AND NOT EXISTS (
+            SELECT 1 FROM import_phone AS i
+            WHERE i.seq = s.seq AND i.number = p.number
+        )
+        """,
+    ),
+    (
+        "phones",
+        """
+        INSERT INTO phone_number (number, org_id)
+        SELECT DISTINCT ON (i.number) i.number, s.id
+        FROM import_phone AS i
+        JOIN import_organization AS s USING (seq)
+        ORDER BY i.number, s.seq DESC
+        ON CONFLICT (number) DO UPDATE SET org_id = EXCLUDED.org_id
+        WHERE phone_number.org_id <> EXCLUDED.org_id
+        """,
+    ),
+)
+
+# A record parsed for staging: organization row, phone numbers, category ids.
+Parsed = Tuple[tuple, List[str], List[int]]
+
+
+class InvalidRecordError(ValueError):
+    pass
+
+
+def read_csv(file: IO[str]) -> Iterator[dict]:
+    """Records of a CSV file with a header row.
+
+    Phones and categories are lists separated by ``CSV_LIST_SEPARATOR``.
+    """
+    for row in csv.DictReader(file):
+        for field in ("phones", "categories"):
+            value = row.get(field) or ""
+            row[field] = [x.strip() for x in value.split(CSV_LIST_SEPARATOR) if x]
+        yield row
+
+
+def read_ndjson(file: IO[str]) -> Iterator[Union[dict, None]]:
+    """Records of a file with one JSON object per line, ``None`` for bad lines."""
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def parse_record(record: Union[dict, None], seq: int) -> Parsed:
+    if record is None:
+        raise InvalidRecordError("Not a JSON object.")
+    try:
+        org_id = record.get("id")
+        org_id = int(org_id) if org_id not in (None, "") else None
+        lon, lat = float(record["lon"]), float(record["lat"])
+        phones, cat_ids = record.get("phones") or [], record.get("categories") or []
+        if not isinstance(phones, list) or not isinstance(cat_ids, list):
+            raise TypeError("phones and categories must be lists")
+        phones = [str(x).strip() for x in phones]
+        cat_ids = [int(x) for x in cat_ids]
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidRecordError(f"{type(e).__name__}: {e}") from e
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise InvalidRecordError("Name is required.")
+    # Also false for NaN.
+    if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        raise InvalidRecordError(f"Invalid coordinates: {lon}, {lat}.")
+    address = tuple(str(record.get(field) or "") for field in ADDRESS_FIELDS)
+    return (seq, org_id, name, lon, lat, *address), phones, cat_ids
+
+
+class OrganizationImporter:
+    """Upserts organizations from a stream of records, one batch at a time.
+
+    Each batch is COPYed into temporary staging tables and merged into the
+    real ones by a few set-based statements in one transaction, so memory
+    holds at most the batch being written and the one being parsed.
+    Addresses are deduplicated by coordinates. Organizations are matched by
+    ``id``, records without one become new organizations with ids from the
+    organization sequence, first moved past every explicit id so they never
+    take over an existing organization. An imported organization's
+    categories and phones are replaced by its record's, unknown category ids
+    are skipped. Invalid records are logged and skipped.
+    """
+
+    def __init__(self, db: Db, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+
+    async def run(self, records: Iterable[Union[dict, None]]) -> dict:
+        stats = dict.fromkeys(
+            ("records", "rejected", *(name for name, _ in UPSERTS if name)), 0
+        )
+        records = enumerate(records, start=1)
+        start = time.perf_counter()
+        batch = await asyncio.to_thread(self._next_batch, records, stats)
+        while batch:
+            # Parse the next batch while this one is written.
+            upcoming = asyncio.ensure_future(
+                asyncio.to_thread(self._next_batch, records, stats)
+            )
+            try:
+                await self._write(batch, stats)
+            except BaseException:
+                upcoming.cancel()
+                raise
+            batch = await upcoming
+            logger.info(
+                "Imported %d records, %.0f records/s",
+                stats["records"],
+                stats["records"] / (time.perf_counter() - start),
+            )
+        seconds = time.perf_counter() - start
+        return {
+            **stats,
+            "seconds": seconds,
+            "records_per_second": stats["records"] / seconds if seconds else 0.0,
+        }
+
+    def _next_batch(self, records: Iterator, stats: dict) -> List[Parsed]:
+        batch = []
+        for seq, record in itertools.islice(records, self.batch_size):
+            try:
+                batch.append(parse_record(record, seq))
+            except InvalidRecordError as e:
+                stats["rejected"] += 1
+                logger.warning("Skipping record %d: %s", seq, e)
+        return batch
+
+    async def _write(self, batch: List[Parsed], stats: dict):
+        async with self.db.session_scope() as sess:
+            for statement in STAGING_TABLES:
+                await sess.execute(text(statement))
+            conn = await sess.connection()
+            raw = await conn.get_raw_connection()
+            copy = raw.driver_connection.copy_records_to_table
+            await copy(
+                "import_organization",
+                records=[org for org, _, _ in batch],
+                columns=ORGANIZATION_COLUMNS,
+            )
+            await copy(
+                "import_phone",
+                records=[
+                    (org[0], phone) for org, phones, _ in batch for phone in phones
+                ],
+                columns=("seq", "number"),
+            )
+            await copy(
+                "import_category",
+                records=[
+                    (org[0], cat_id) for org, _, cat_ids in batch for cat_id in cat_ids
+                ],
+                columns=("seq", "cat_id"),
+            )
+            counts = {}
+            for name, statement in UPSERTS:
+                res = await sess.execute(text(statement))
+                if name == "unknown_categories":
+                    counts[name] = res.scalar_one()
+                elif name:
+                    counts[name] = res.rowcount
+        stats["records"] += len(batch)
+        for name, count in counts.items():
+            stats[name] += count
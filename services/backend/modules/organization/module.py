@@ -1,269 +1,686 @@
-from typing import List, Union
+import math
+from typing import AsyncIterator, List, Tuple, Type, Union
 
-from geoalchemy2 import Geography, Geometry
+import numpy as np
+from geoalchemy2 import Geography
 from geoalchemy2 import functions as geo_func
-from geoalchemy2.shape import from_shape, to_shape
+from geoalchemy2.shape import from_shape
 from shapely.geometry import Point
-from sqlalchemy import func, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import (
+    JSON,
+    ColumnElement,
+    Integer,
+    Select,
+    String,
+    Text,
+    and_,
+    any_,
+    bindparam,
+    func,
+    literal_column,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+
+from services.app.settings import settings
 
 from services.backend.modules.base import ModuleWithDb
-from services.backend.modules.category.schemas import CategoryFull
-from services.backend.modules.organization.schemas import OrgFull
-from services.db.models import Address, Category, Organization
+from services.backend.modules.organization.geodesic import area_envelope
+from services.backend.modules.organization.pagination import (
+    DEFAULT_LIMIT,
+    decode_cursor,
+    encode_cursor,
+)
+from services.backend.modules.organization.schemas import (
+    OrgDocumentPage,
+    OrgFull,
+    OrgNearest,
+    OrgPage,
+)
+from services.backend.modules.organization.spatial import (
+    EARTH_RADIUS_METERS,
+    BBox,
+    PointEntries,
+    SpatialIndex,
+    bbox_around,
+    haversine,
+)
+from services.backend.modules.organization.spatial import Point as LonLat
+from services.backend.singleflight import coalesce
+from services.db import Db
+from services.db.models import (
+    Address,
+    Category,
+    Organization,
+    OrganizationCategory,
+    PhoneNumber,
+    org_document,
+)
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.3
+
+# Rows buffered from the server-side cursor by the stream_* methods.
+STREAM_BATCH_SIZE = 500
+
+# The spatial index only preselects candidates with spherical math, PostGIS
+# gives the exact answer, so the preselection is widened to never lose a
+# spheroid match.
+PREFILTER_MARGIN = 1.01
+# Searches with more candidates than this go straight to PostGIS, rather than
+# sending every id as one array parameter.
+MAX_PREFILTER_CANDIDATES = 10_000
+
+# A search is its WHERE clause plus the unique sort key its pages follow.
+Search = Tuple[ColumnElement, List[ColumnElement]]
+
+# Organizations as OrgFull, or as JSON documents from ``org_document``.
+Orgs = Union[List[OrgFull], List[str]]
+Page = Union[OrgPage, OrgDocumentPage]
 
 
 class OrganizationModule(ModuleWithDb):
-    async def get_by_id(self, org_id: int) -> Union[OrgFull, None]:
-        query = (
-            select(Organization)
-            .options(
-                selectinload(Organization.address),
-                selectinload(Organization.categories),
-            )
-            .where(Organization.id == org_id)
+    """Organization searches.
+
+    Every search is a single Core statement that selects just the columns of
+    ``OrgFull``: coordinates come from the generated ``lat``/``lon`` columns
+    of ``address``, phones are aggregated with ``array_agg`` and categories
+    with ``json_agg``, so no ORM objects or Shapely geometries are built on
+    the way to the response and the query count does not grow with the
+    number of results.
+
+    Searches that can match an unbounded number of organizations return an
+    ``OrgPage`` of at most ``limit`` items, ordered by id, or by distance for
+    the geo searches, plus a keyset cursor for the next page. Their
+    ``stream_*`` counterparts yield every match, unordered, from a server-side
+    cursor.
+
+    Concurrent calls with equal arguments share a single query, see
+    ``coalesce``. Results cached until the next change notification are
+    fetched with ``fresh=True``: from the primary, never from a lagging
+    replica, and by a query of their own, never one that started before the
+    change.
+
+    With the spatial index enabled, every organization's coordinates are
+    kept in memory and radius, area and coords searches take their
+    candidates from it, leaving Postgres to check and hydrate just those.
+
+    With ``documents=True`` searches return the JSON text of each
+    organization from the ``org_document`` materialized view instead: no
+    categories aggregation and no ``OrgFull`` built. The view is as fresh as
+    its last ``refresh_documents``, run only after a change notification.
+    """
+
+    def __init__(self, db: Db):
+        super().__init__(db=db)
+        self.spatial: Union[SpatialIndex, None] = None
+        if settings.SPATIAL_INDEX_ENABLED:
+            self.spatial = SpatialIndex()
+        # Changes may have been made while no process was listening.
+        self.documents_dirty = True
+
+    @coalesce
+    async def get_by_id(
+        self, org_id: int, documents: bool = False, fresh: bool = False
+    ) -> Union[OrgFull, str, None]:
+        result = await self._fetch(
+            self._select(documents, Organization.id == org_id).order_by(
+                Organization.id
+            ),
+            documents,
+            fresh=fresh,
         )
-        async with self.db.session_scope() as sess:
-            org = await sess.execute(query)
-            org = org.scalar_one_or_none()
-            if org:
-                org_coords = to_shape(org.address.coordinates)
-                result = OrgFull(
-                    id=org.id,
-                    name=org.name,
-                    coordinates=f"{org_coords.y}, {org_coords.x}",
-                    address=f"{org.address.country}, {org.address.city}, {org.address.street}, {org.address.home}",
-                    categories=[
-                        CategoryFull(id=cat.id, parent_id=cat.parent_id, name=cat.name)
-                        for cat in org.categories
-                    ],
-                )
-            else:
-                result = None
-        return result
+        return result[0] if result else None
+
+    @coalesce
+    async def get_by_ids(
+        self, org_ids: List[int], documents: bool = False
+    ) -> List[Union[OrgFull, str, None]]:
+        """Organizations in the order of ``org_ids``, ``None`` for unknown ids."""
+        rows = await self._fetch_rows(self._select(documents, self._id_among(org_ids)))
+        found = {row.id: self._render(row, documents) for row in rows}
+        return [found.get(org_id) for org_id in org_ids]
+
+    @coalesce
+    async def get_by_coords(
+        self, lon: float, lat: float, documents: bool = False
+    ) -> Orgs:
+        where = Address.coordinates == from_shape(Point(lon, lat), srid=4326)
+        if self.spatial is not None and self.spatial.loaded:
+            ids = self.spatial.at(lon, lat)
+            if not len(ids):
+                return []
+            where = and_(self._id_among(ids.tolist()), where)
+        return await self._fetch(
+            self._select(documents, where).order_by(Organization.id), documents
+        )
+
+    @coalesce
+    async def get_by_categories(
+        self,
+        cat_ids: List[int],
+        limit: int = DEFAULT_LIMIT,
+        cursor: Union[str, None] = None,
+        documents: bool = False,
+        fresh: bool = False,
+    ) -> Page:
+        return await self._fetch_page(
+            *self._by_categories(cat_ids),
+            limit=limit,
+            cursor=cursor,
+            documents=documents,
+            fresh=fresh,
+        )
+
+    def stream_by_categories(
+        self, cat_ids: List[int], documents: bool = False
+    ) -> AsyncIterator[Union[OrgFull, str]]:
+        return self._stream(*self._by_categories(cat_ids), documents=documents)
+
+    @coalesce
+    async def get_by_name(
+        self,
+        name: str,
+        limit: int = DEFAULT_LIMIT,
+        cursor: Union[str, None] = None,
+        documents: bool = False,
+    ) -> Page:
+        return await self._fetch_page(
+            *self._by_name(name), limit=limit, cursor=cursor, documents=documents
+        )
+
+    def stream_by_name(
+        self, name: str, documents: bool = False
+    ) -> AsyncIterator[Union[OrgFull, str]]:
+        return self._stream(*self._by_name(name), documents=documents)
 
-    async def get_by_coords(self, lon: float, lat: float) -> List[OrgFull]:
+    @coalesce
+    async def get_by_similarity(
+        self,
+        name: str,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        limit: int = DEFAULT_LIMIT,
+        documents: bool = False,
+    ) -> Orgs:
+        """Fuzzy name search ranked by trigram similarity, best match first.
+
+        The ``%`` operator is what lets Postgres use the ``gin_trgm_ops`` index,
+        and it compares against ``pg_trgm.similarity_threshold``, so the
+        threshold is set for the current transaction first.
+        """
+        similarity = func.similarity(Organization.name, name)
         query = (
-            select(Address)
-            .options(
-                selectinload(Address.organizations).selectinload(
-                    Organization.categories
+            self._select(documents, Organization.name.op("%")(name))
+            .order_by(similarity.desc(), Organization.id)
+            .limit(limit)
+        )
+        async with self.db.read_session_scope(transaction=True) as sess:
+            await sess.execute(
+                select(
+                    func.set_config(
+                        "pg_trgm.similarity_threshold", str(threshold), True
+                    )
                 )
             )
-            .where(Address.coordinates == from_shape(Point(lon, lat), srid=4326))
+            res = await sess.execute(query)
+            rows = res.all()
+        return [self._render(row, documents) for row in rows]
+
+    @coalesce
+    async def get_by_radius(
+        self,
+        lon: float,
+        lat: float,
+        radius_meters: int,
+        limit: int = DEFAULT_LIMIT,
+        cursor: Union[str, None] = None,
+        documents: bool = False,
+    ) -> Page:
+        where, keys = self._by_radius(lon, lat, radius_meters)
+        margin = radius_meters * PREFILTER_MARGIN + 1
+        entries = self._candidates(bbox_around(lon, lat, margin, margin))
+        if entries is not None:
+            ids = entries.ids[haversine(lon, lat, entries.lons, entries.lats) <= margin]
+            if not len(ids):
+                return (OrgDocumentPage if documents else OrgPage)(items=[])
+            where = and_(self._id_among(ids.tolist()), where)
+        return await self._fetch_page(
+            where, keys, limit=limit, cursor=cursor, documents=documents
         )
-        result = []
-        async with self.db.session_scope() as sess:
-            address = await sess.execute(query)
-            address = address.scalar_one_or_none()
-            organizations = address.organizations if address else []
-            for organization in organizations:
-                org_coords = to_shape(address.coordinates)
-                result.append(
-                    OrgFull(
-                        id=organization.id,
-                        name=organization.name,
-                        coordinates=f"{org_coords.y}, {org_coords.x}",
-                        address=f"{address.country}, {address.city}, {address.street}, {address.home}",
-                        categories=[
-                            CategoryFull(
-                                id=cat.id, parent_id=cat.parent_id, name=cat.name
-                            )
-                            for cat in organization.categories
-                        ],
-                    )
+
+    def stream_by_radius(
+        self, lon: float, lat: float, radius_meters: int, documents: bool = False
+    ) -> AsyncIterator[Union[OrgFull, str]]:
+        return self._stream(
+            *self._by_radius(lon, lat, radius_meters), documents=documents
+        )
+
+    @coalesce
+    async def get_by_area(
+        self,
+        lon: float,
+        lat: float,
+        height: int,
+        width: int,
+        limit: int = DEFAULT_LIMIT,
+        cursor: Union[str, None] = None,
+        documents: bool = False,
+    ) -> Page:
+        where, keys = self._by_area(lon, lat, height, width)
+        half_width = width / 2 * PREFILTER_MARGIN + 1
+        # Rectangle edges are great circles on geography, the east-west ones
+        # bulge poleward by up to this much.
+        bulge = (
+            half_width**2
+            / (2 * EARTH_RADIUS_METERS)
+            * math.tan(math.radians(min(abs(lat), 89)))
+        )
+        bbox = bbox_around(
+            lon, lat, half_width, height / 2 * PREFILTER_MARGIN + 1 + bulge
+        )
+        entries = self._candidates(bbox)
+        if entries is not None:
+            west, south, east, north = bbox
+            ids = entries.ids[
+                (entries.lons >= west)
+                & (entries.lons <= east)
+                & (entries.lats >= south)
+                & (entries.lats <= north)
+            ]
+            if not len(ids):
+                return (OrgDocumentPage if documents else OrgPage)(items=[])
+            where = and_(self._id_among(ids.tolist()), where)
+        return await self._fetch_page(
+            where, keys, limit=limit, cursor=cursor, documents=documents
+        )
+
+    def stream_by_area(
+        self,
+        lon: float,
+        lat: float,
+        height: int,
+        width: int,
+        documents: bool = False,
+    ) -> AsyncIterator[Union[OrgFull, str]]:
+        return self._stream(
+            *self._by_area(lon, lat, height, width), documents=documents
+        )
+
+    @coalesce
+    async def get_by_filters(
+        self,
+        lon: Union[float, None] = None,
+        lat: Union[float, None] = None,
+        radius_meters: Union[int, None] = None,
+        height: Union[int, None] = None,
+        width: Union[int, None] = None,
+        cat_ids: Union[List[int], None] = None,
+        name: Union[str, None] = None,
+        limit: int = DEFAULT_LIMIT,
+        cursor: Union[str, None] = None,
+        documents: bool = False,
+    ) -> Page:
+        """Organizations matching every given filter.
+
+        The filters are ANDed in a single statement, so Postgres starts from
+        whichever index it estimates most selective (GiST on the coordinates,
+        trigram on the name or the category index) and checks the rest on
+        its matches. Pages are ordered like the geo search when there is one,
+        by id otherwise.
+        """
+        return await self._fetch_page(
+            *self._by_filters(lon, lat, radius_meters, height, width, cat_ids, name),
+            limit=limit,
+            cursor=cursor,
+            documents=documents,
+        )
+
+    def stream_by_filters(
+        self,
+        lon: Union[float, None] = None,
+        lat: Union[float, None] = None,
+        radius_meters: Union[int, None] = None,
+        height: Union[int, None] = None,
+        width: Union[int, None] = None,
+        cat_ids: Union[List[int], None] = None,
+        name: Union[str, None] = None,
+        documents: bool = False,
+    ) -> AsyncIterator[Union[OrgFull, str]]:
+        return self._stream(
+            *self._by_filters(lon, lat, radius_meters, height, width, cat_ids, name),
+            documents=documents,
+        )
+
+    def invalidate_documents(self, payload: Union[str, None] = None):
+        """Marks ``org_document`` for the next refresh, on any change notification."""
+        self.documents_dirty = True
+
+    async def refresh_documents(self, concurrently: bool = True):
+        """Re-renders ``org_document`` from the tables.
+
+        A concurrent refresh keeps the view readable while it runs, at the
+        cost of diffing against the old contents.
+        """
+        concurrently = "CONCURRENTLY " if concurrently else ""
+        # Cleared first, changes made during the refresh mark it again.
+        self.documents_dirty = False
+        try:
+            async with self.db.session_scope() as sess:
+                await sess.execute(
+                    text(f"REFRESH MATERIALIZED VIEW {concurrently}org_document")
                 )
-            sess.expunge_all()
-        return result
+        except BaseException:
+            self.documents_dirty = True
+            raise
 
-    async def get_by_categories(self, cat_ids: List[int]) -> List[OrgFull]:
+    async def refresh_spatial_index(self):
+        """Reloads the organizations at the changed points, or all of them."""
+        points = self.spatial.take_pending()
+        try:
+            entries = await self._load_points(points)
+        except BaseException:
+            self.spatial.invalidate(points)
+            raise
+        self.spatial.replace(entries, points)
+
+    @coalesce
+    async def get_nearest(
+        self,
+        lon: float,
+        lat: float,
+        k: int,
+        cat_ids: Union[List[int], None] = None,
+    ) -> List[OrgNearest]:
+        """The ``k`` organizations closest to the point, nearest first.
+
+        Ordering by the ``<->`` operator lets the GiST index on
+        ``address.coordinates`` return addresses nearest first, so the scan
+        stops after ``k`` matches however many organizations are around.
+        """
+        point = func.cast(
+            geo_func.ST_SetSRID(geo_func.ST_MakePoint(lon, lat), 4326), Geography
+        )
+        where = [self._by_categories(cat_ids)[0]] if cat_ids is not None else []
         query = (
-            select(Category)
-            .options(
-                selectinload(Category.organizations).selectinload(
-                    Organization.categories
-                ),
-                selectinload(Category.organizations).selectinload(Organization.address),
+            self._select_orgs(*where)
+            .add_columns(
+                geo_func.ST_Distance(Address.coordinates, point).label("distance")
             )
-            .where(Category.id.in_(cat_ids))
+            .order_by(Address.coordinates.distance_centroid(point), Organization.id)
+            .limit(k)
         )
-        result = []
-        result_ids = set()
-        async with self.db.session_scope() as sess:
+        async with self.db.read_session_scope() as sess:
             res = await sess.execute(query)
-            categories: List[Category] = res.scalars().all()
-            for cat in categories:
-                for org in cat.organizations:
-                    if org.id not in result_ids:
-                        org_coords = to_shape(org.address.coordinates)
-                        result.append(
-                            OrgFull(
-                                id=org.id,
-                                name=org.name,
-                                coordinates=f"{org_coords.y}, {org_coords.x}",
-                                address=f"{org.address.country}, {org.address.city}, {org.address.street}, {org.address.home}",
-                                categories=[
-                                    CategoryFull(
-                                        id=cat.id,
-                                        parent_id=cat.parent_id,
-                                        name=cat.name,
-                                    )
-                                    for cat in org.categories
-                                ],
-                            )
-                        )
-                        result_ids.add(org.id)
-            sess.expunge_all()
-        return result
+            rows = res.all()
+        return [
+            self._to_schema(row, OrgNearest, distance_meters=row.distance)
+            for row in rows
+        ]
 
-    async def get_by_name(self, name: str) -> List[OrgFull]:
-        query = (
-            select(Organization)
-            .options(
-                selectinload(Organization.categories),
-                selectinload(Organization.address),
+    @staticmethod
+    def _by_categories(cat_ids: List[int]) -> Search:
+        # EXISTS stops at the first matching category of an organization, so
+        # it is selected once however many of the categories it has.
+        return (
+            select(OrganizationCategory.org_id)
+            .where(
+                OrganizationCategory.org_id == Organization.id,
+                OrganizationCategory.cat_id
+                == any_(bindparam("cat_ids", cat_ids, type_=ARRAY(Integer))),
             )
-            .where(Organization.name.ilike(name))
+            .exists(),
+            [Organization.id],
         )
-        result = []
-        result_ids = set()
-        async with self.db.session_scope() as sess:
-            res = await sess.execute(query)
-            organizations: List[Organization] = res.scalars().all()
-            for org in organizations:
-                if org.id not in result_ids:
-                    org_coords = to_shape(org.address.coordinates)
-                    result.append(
-                        OrgFull(
-                            id=org.id,
-                            name=org.name,
-                            coordinates=f"{org_coords.y}, {org_coords.x}",
-                            address=f"{org.address.country}, {org.address.city}, {org.address.street}, {org.address.home}",
-                            categories=[
-                                CategoryFull(
-                                    id=cat.id, parent_id=cat.parent_id, name=cat.name
-                                )
-                                for cat in org.categories
-                            ],
-                        )
-                    )
-                    result_ids.add(org.id)
-            sess.expunge_all()
-        return result
 
-    async def get_by_radius(self, lon: float, lat: float, radius_meters: int):
-        query = (
-            select(Address)
-            .options(
-                selectinload(Address.organizations).selectinload(
-                    Organization.categories
+    @staticmethod
+    def _by_name(name: str) -> Search:
+        return Organization.name.ilike(name), [Organization.id]
+
+    @classmethod
+    def _by_radius(cls, lon: float, lat: float, radius_meters: int) -> Search:
+        point = geo_func.ST_SetSRID(geo_func.ST_Point(lon, lat), 4326)
+        return (
+            geo_func.ST_DWithin(Address.coordinates, point, radius_meters),
+            [cls._distance(point), Organization.id],
+        )
+
+    @classmethod
+    def _by_area(cls, lon: float, lat: float, height: int, width: int) -> Search:
+        # The envelope is computed here rather than with ST_Project in SQL, so
+        # the statement has a constant to match against the GiST index.
+        envelope = func.cast(
+            geo_func.ST_MakeEnvelope(*area_envelope(lon, lat, height, width), 4326),
+            Geography,
+        )
+        return (
+            and_(
+                Address.coordinates.intersects(envelope),
+                geo_func.ST_Intersects(Address.coordinates, envelope),
+            ),
+            [
+                cls._distance(
+                    geo_func.ST_SetSRID(geo_func.ST_MakePoint(lon, lat), 4326)
+                ),
+                Organization.id,
+            ],
+        )
+
+    @classmethod
+    def _by_filters(
+        cls,
+        lon: Union[float, None],
+        lat: Union[float, None],
+        radius_meters: Union[int, None],
+        height: Union[int, None],
+        width: Union[int, None],
+        cat_ids: Union[List[int], None],
+        name: Union[str, None],
+    ) -> Search:
+        """Combines the searches of the given filters, at least one is needed.
+
+        Radius takes ``lon``, ``lat`` and ``radius_meters``, area ``lon``,
+        ``lat``, ``height`` and ``width``; only one of them may be given.
+        """
+        where, keys = [], [Organization.id]
+        if radius_meters is not None:
+            geo_where, keys = cls._by_radius(lon, lat, radius_meters)
+            where.append(geo_where)
+        elif height is not None:
+            geo_where, keys = cls._by_area(lon, lat, height, width)
+            where.append(geo_where)
+        if cat_ids is not None:
+            where.append(cls._by_categories(cat_ids)[0])
+        if name is not None:
+            where.append(cls._by_name(name)[0])
+        if not where:
+            raise ValueError("At least one filter is required.")
+        return and_(*where), keys
+
+    @staticmethod
+    def _id_among(ids: List[int]) -> ColumnElement:
+        # A single array parameter, however many ids there are.
+        return Organization.id == any_(bindparam("org_ids", ids, type_=ARRAY(Integer)))
+
+    @staticmethod
+    def _distance(point) -> ColumnElement:
+        return geo_func.ST_Distance(Address.coordinates, func.cast(point, Geography))
+
+    @staticmethod
+    def _select_orgs(*where) -> Select:
+        categories = (
+            select(
+                func.coalesce(
+                    func.json_agg(
+                        aggregate_order_by(
+                            func.json_build_object(
+                                "id",
+                                Category.id,
+                                "parent_id",
+                                Category.parent_id,
+                                "name",
+                                Category.name,
+                            ),
+                            Category.id,
+                        )
+                    ),
+                    literal_column("'[]'::json"),
+                    type_=JSON,
                 )
             )
-            .where(
-                geo_func.ST_DWithin(
-                    Address.coordinates,
-                    geo_func.ST_SetSRID(geo_func.ST_Point(lon, lat), 4326),
-                    radius_meters,
+            .select_from(OrganizationCategory)
+            .join(Category, Category.id == OrganizationCategory.cat_id)
+            .where(OrganizationCategory.org_id == Organization.id)
+            .scalar_subquery()
+        )
+        phones = (
+            select(
+                func.coalesce(
+                    func.array_agg(
+                        aggregate_order_by(PhoneNumber.number, PhoneNumber.number)
+                    ),
+                    literal_column("'{}'::varchar[]"),
+                    type_=ARRAY(String),
                 )
             )
+            .where(PhoneNumber.org_id == Organization.id)
+            .scalar_subquery()
+        )
+        return (
+            select(
+                Organization.id,
+                Organization.name,
+                Address.lat,
+                Address.lon,
+                Address.country,
+                Address.city,
+                Address.street,
+                Address.home,
+                phones.label("phones"),
+                categories.label("categories"),
+            )
+            .join(Address, Address.id == Organization.address_id)
+            .where(*where)
         )
-        result = []
-        result_ids = set()
-        async with self.db.session_scope() as sess:
+
+    def _candidates(self, bbox: Union[BBox, None]) -> Union[PointEntries, None]:
+        """Organizations within ``bbox`` from the spatial index, if loaded.
+
+        ``None`` when the index is disabled or not worth it for this box.
+        """
+        if self.spatial is None or not self.spatial.loaded or bbox is None:
+            return None
+        entries = self.spatial.within(bbox)
+        if len(entries.ids) > MAX_PREFILTER_CANDIDATES:
+            return None
+        return entries
+
+    async def _load_points(self, points: Union[List[LonLat], None]) -> PointEntries:
+        query = select(Organization.id, Address.lon, Address.lat).join(
+            Address, Address.id == Organization.address_id
+        )
+        if points is not None:
+            if not points:
+                return PointEntries.concat(())
+            query = query.where(tuple_(Address.lon, Address.lat).in_(points))
+        # Kept until the next change notification, so read from the primary:
+        # a lagging replica could leave the index stale for much longer.
+        async with self.db.read_session_scope(use_replica=False) as sess:
             res = await sess.execute(query)
-            addresses: List[Address] = res.scalars().all()
-            for addr in addresses:
-                for org in addr.organizations:
-                    if org.id not in result_ids:
-                        org_coords = to_shape(addr.coordinates)
-                        result.append(
-                            OrgFull(
-                                id=org.id,
-                                name=org.name,
-                                coordinates=f"{org_coords.y}, {org_coords.x}",
-                                address=f"{addr.country}, {addr.city}, {addr.street}, {addr.home}",
-                                categories=[
-                                    CategoryFull(
-                                        id=cat.id,
-                                        parent_id=cat.parent_id,
-                                        name=cat.name,
-                                    )
-                                    for cat in org.categories
-                                ],
-                            )
-                        )
-                        result_ids.add(org.id)
-        return result
-
-    async def get_by_area(self, lon: float, lat: float, height: int, width: int):
-        center = select(
-            geo_func.ST_SetSRID(geo_func.ST_MakePoint(lon, lat), 4326)
-            .cast(Geography)
-            .label("geom")
-        ).cte("center")
-
-        ns = select(
-            geo_func.ST_Project(center.c.geom, height / 2, func.radians(0)).label(
-                "north"
-            ),
-            geo_func.ST_Project(center.c.geom, height / 2, func.radians(180)).label(
-                "south"
-            ),
-        ).cte("ns")
-
-        corners = select(
-            geo_func.ST_Project(ns.c.north, width / 2, func.radians(90)).label("ne"),
-            geo_func.ST_Project(ns.c.south, width / 2, func.radians(270)).label("sw"),
-        ).cte("corners")
-
-        rectangle = select(
-            geo_func.ST_MakeEnvelope(
-                geo_func.ST_X(func.cast(corners.c.sw, Geometry)),
-                geo_func.ST_Y(func.cast(corners.c.sw, Geometry)),
-                geo_func.ST_X(func.cast(corners.c.ne, Geometry)),
-                geo_func.ST_Y(func.cast(corners.c.ne, Geometry)),
-                4326,
-            ).label("rect")
-        ).cte("rectangle")
+            rows = res.all()
+        ids, lons, lats = zip(*rows) if rows else ((), (), ())
+        return PointEntries(
+            np.array(ids, dtype=np.int64),
+            np.array(lons, dtype=np.float64),
+            np.array(lats, dtype=np.float64),
+        )
 
-        query = (
-            select(Address)
-            .options(
-                selectinload(Address.organizations).selectinload(
-                    Organization.categories
-                )
+    @classmethod
+    def _select(cls, documents: bool, *where) -> Select:
+        if documents:
+            return cls._select_documents(*where)
+        return cls._select_orgs(*where)
+
+    @staticmethod
+    def _select_documents(*where) -> Select:
+        # Address stays joined, the search conditions may refer to it.
+        return (
+            select(Organization.id, func.cast(org_document.c.doc, Text).label("doc"))
+            .join(Address, Address.id == Organization.address_id)
+            .join(org_document, org_document.c.id == Organization.id)
+            .where(*where)
+        )
+
+    async def _fetch_rows(self, query: Select, fresh: bool = False) -> list:
+        async with self.db.read_session_scope(use_replica=not fresh) as sess:
+            res = await sess.execute(query)
+            return res.all()
+
+    async def _fetch(
+        self, query: Select, documents: bool = False, fresh: bool = False
+    ) -> Orgs:
+        return [
+            self._render(row, documents)
+            for row in await self._fetch_rows(query, fresh=fresh)
+        ]
+
+    async def _fetch_page(
+        self,
+        where: ColumnElement,
+        keys: List[ColumnElement],
+        limit: int,
+        cursor: Union[str, None],
+        documents: bool = False,
+        fresh: bool = False,
+    ) -> Page:
+        """Fetches one page of the search ordered by its unique sort ``keys``."""
+        query = self._select(documents, where)
+        if cursor is not None:
+            query = query.where(
+                tuple_(*keys) > tuple_(*decode_cursor(cursor, len(keys)))
             )
-            .where(
-                geo_func.ST_Intersects(
-                    Address.coordinates, func.cast(rectangle.c.rect, Geography)
-                )
+        query = (
+            query.add_columns(*(key.label(f"key_{i}") for i, key in enumerate(keys)))
+            .order_by(*keys)
+            .limit(limit + 1)
+        )
+        rows = await self._fetch_rows(query, fresh=fresh)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(
+                *(getattr(rows[-1], f"key_{i}") for i in range(len(keys)))
             )
+        items = [self._render(row, documents) for row in rows]
+        if documents:
+            return OrgDocumentPage(items=items, next_cursor=next_cursor)
+        return OrgPage(items=items, next_cursor=next_cursor)
+
+    async def _stream(
+        self, where: ColumnElement, keys: List[ColumnElement], documents: bool = False
+    ) -> AsyncIterator[Union[OrgFull, str]]:
+        # No ORDER BY, so the first rows leave before the last ones are found.
+        query = self._select(documents, where).execution_options(
+            yield_per=STREAM_BATCH_SIZE
         )
+        # Server-side cursors only live inside a transaction.
+        async with self.db.read_session_scope(transaction=True) as sess:
+            res = await sess.stream(query)
+            async for row in res:
+                yield self._render(row, documents)
 
-        result = []
-        result_ids = set()
-        async with self.db.session_scope() as sess:
-            res = await sess.execute(query)
-            addresses: List[Address] = res.scalars().all()
-            for addr in addresses:
-                for org in addr.organizations:
-                    if org.id not in result_ids:
-                        org_coords = to_shape(addr.coordinates)
-                        result.append(
-                            OrgFull(
-                                id=org.id,
-                                name=org.name,
-                                coordinates=f"{org_coords.y}, {org_coords.x}",
-                                address=f"{addr.country}, {addr.city}, {addr.street}, {addr.home}",
-                                categories=[
-                                    CategoryFull(
-                                        id=cat.id,
-                                        parent_id=cat.parent_id,
-                                        name=cat.name,
-                                    )
-                                    for cat in org.categories
-                                ],
-                            )
-                        )
-                        result_ids.add(org.id)
-        return result
+    @classmethod
+    def _render(cls, row, documents: bool) -> Union[OrgFull, str]:
+        return row.doc if documents else cls._to_schema(row)
+
+    @staticmethod
+    def _to_schema(row, schema: Type[OrgFull] = OrgFull, **extra) -> OrgFull:
+        return schema(
+            id=row.id,
+            name=row.name,
+            coordinates=f"{row.lat}, {row.lon}",
+            address=f"{row.country}, {row.city}, {row.street}, {row.home}",
+            phones=row.phones,
+            categories=row.categories,
+            **extra,
+        )
@@ -0,0 +1,29 @@
+import base64
+import json
+from typing import List, Union
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(*key: Union[int, float]) -> str:
+    """Opaque keyset cursor: the sort key of the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> List[Union[int, float]]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError as e:
+        raise InvalidCursorError("Malformed cursor.") from e
+    if (
+        not isinstance(key, list)
+        or len(key) != size
+        or not all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in key)
+    ):
+        raise InvalidCursorError("Cursor does not belong to this search.")
+    return key
@@ -1,9 +1,11 @@
-from typing import List
+from typing import List, Union
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from services.backend.modules.category.schemas import CategoryFull
 
+MAX_BATCH_SIZE = 1000
+
 
 class OrgFull(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -12,4 +14,25 @@ class OrgFull(BaseModel):
     name: str
     coordinates: str
     address: str
+    phones: List[str]
     categories: List[CategoryFull]
+
+
+class OrgNearest(OrgFull):
+    distance_meters: float
+
+
+class OrgPage(BaseModel):
+    items: List[OrgFull]
+    next_cursor: Union[str, None] = None
+
+
+class OrgDocumentPage(BaseModel):
+    """Like ``OrgPage``, with organizations as ready JSON documents."""
+
+    items: List[str]
+    next_cursor: Union[str, None] = None
+
+
+class OrgBatchRequest(BaseModel):
+    ids: List[int] = Field(max_length=MAX_BATCH_SIZE)
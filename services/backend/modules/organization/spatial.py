@@ -0,0 +1,182 @@
+import math
+from typing import Iterable, List, Set, Tuple, Union
+
+import numpy as np
+
+EARTH_RADIUS_METERS = 6_371_008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+Point = Tuple[float, float]
+BBox = Tuple[float, float, float, float]
+
+# Past this many changed points a refresh reloads everything instead.
+MAX_REFRESH_POINTS = 10_000
+
+
+class PointEntries:
+    """Organizations as parallel arrays of ids and coordinates."""
+
+    __slots__ = ("ids", "lons", "lats")
+
+    def __init__(self, ids: np.ndarray, lons: np.ndarray, lats: np.ndarray):
+        self.ids = ids
+        self.lons = lons
+        self.lats = lats
+
+    @property
+    def nbytes(self) -> int:
+        return self.ids.nbytes + self.lons.nbytes + self.lats.nbytes
+
+    @classmethod
+    def concat(cls, entries: Iterable["PointEntries"]) -> "PointEntries":
+        entries = list(entries)
+        if not entries:
+            return cls(
+                np.empty(0, dtype=np.int64),
+                np.empty(0, dtype=np.float64),
+                np.empty(0, dtype=np.float64),
+            )
+        return cls(
+            np.concatenate([x.ids for x in entries]),
+            np.concatenate([x.lons for x in entries]),
+            np.concatenate([x.lats for x in entries]),
+        )
+
+
+def bbox_around(lon: float, lat: float, half_width: float, half_height: float):
+    """Lon/lat box extending the given meters from the point, or ``None``.
+
+    ``None`` means the box crosses the antimeridian or a pole and the caller
+    should not prefilter with it.
+    """
+    dlat = half_height / METERS_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+    if cos_lat <= 0:
+        return None
+    dlon = half_width / (METERS_PER_DEGREE * cos_lat)
+    bbox = (lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+    if bbox[0] < -180 or bbox[2] > 180 or max(abs(bbox[1]), abs(bbox[3])) > 90:
+        return None
+    return bbox
+
+
+def haversine(lon: float, lat: float, lons: np.ndarray, lats: np.ndarray):
+    lon, lat = math.radians(lon), math.radians(lat)
+    lons, lats = np.radians(lons), np.radians(lats)
+    a = (
+        np.sin((lats - lat) / 2) ** 2
+        + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(a))
+
+
+class SpatialIndex:
+    """Every organization's (lon, lat) in memory, sorted by latitude.
+
+    A box lookup binary searches the latitude band and filters longitudes
+    within it, with no per-organization Python code.
+
+    Changes are applied in batches by ``refresh``: address notifications only
+    record the affected points, or that everything has to be reloaded, and
+    the next refresh reloads the organizations at exactly those points.
+    """
+
+    def __init__(self):
+        self.entries: Union[PointEntries, None] = None
+        self.refreshes = 0
+        self.full_reloads = 0
+        self._pending: Set[Point] = set()
+        self._reload = True
+
+    @property
+    def loaded(self) -> bool:
+        return self.entries is not None
+
+    @property
+    def dirty(self) -> bool:
+        return self._reload or bool(self._pending)
+
+    def within(self, bbox: BBox) -> PointEntries:
+        west, south, east, north = bbox
+        entries = self.entries
+        start = np.searchsorted(entries.lats, south, side="left")
+        stop = np.searchsorted(entries.lats, north, side="right")
+        lons = entries.lons[start:stop]
+        mask = (lons >= west) & (lons <= east)
+        return PointEntries(
+            entries.ids[start:stop][mask], lons[mask], entries.lats[start:stop][mask]
+        )
+
+    def at(self, lon: float, lat: float) -> np.ndarray:
+        """Ids of the organizations at exactly this point."""
+        return self.within((lon, lat, lon, lat)).ids
+
+    def invalidate(self, points: Union[Iterable[Point], None] = None):
+        """Marks the (lon, lat) points for the next refresh, or everything."""
+        if points is None:
+            self._reload = True
+            self._pending.clear()
+        elif not self._reload:
+            self._pending.update(points)
+
+    def invalidate_payload(self, payload: Union[str, None]):
+        """Handles an ``address_changed`` notification: ``lon lat;lon lat;...``."""
+        if not payload:
+            self.invalidate()
+            return
+        self.invalidate(
+            tuple(float(x) for x in point.split())
+            for point in payload.split(";")
+            if point
+        )
+
+    def take_pending(self) -> Union[List[Point], None]:
+        """Points to reload and clears them, ``None`` for a full reload."""
+        if self._reload:
+            self._reload = False
+            self._pending.clear()
+            return None
+        points, self._pending = list(self._pending), set()
+        if len(points) > MAX_REFRESH_POINTS:
+            return None
+        return points
+
+    def replace(self, entries: PointEntries, points: Union[List[Point], None] = None):
+        """Swaps in the organizations loaded at ``points``, or all of them."""
+        self.refreshes += 1
+        if points is None:
+            self.full_reloads += 1
+            self.entries = self._sorted(entries)
+            return
+        current = self.entries
+        # Points as complex numbers, to match both coordinates in one isin.
+        keep = ~np.isin(
+            current.lons + 1j * current.lats,
+            np.array([complex(lon, lat) for lon, lat in points]),
+        )
+        self.entries = self._sorted(
+            PointEntries.concat(
+                (
+                    PointEntries(
+                        current.ids[keep], current.lons[keep], current.lats[keep]
+                    ),
+                    entries,
+                )
+            )
+        )
+
+    def stats(self) -> dict:
+        return {
+            "organizations": len(self.entries.ids) if self.loaded else 0,
+            "bytes_used": self.entries.nbytes if self.loaded else 0,
+            "pending_points": len(self._pending),
+            "refreshes": self.refreshes,
+            "full_reloads": self.full_reloads,
+        }
+
+    @staticmethod
+    def _sorted(entries: PointEntries) -> PointEntries:
+        order = np.argsort(entries.lats, kind="stable")
+        return PointEntries(
+            entries.ids[order], entries.lons[order], entries.lats[order]
+        )
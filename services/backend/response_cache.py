@@ -0,0 +1,62 @@
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, Union
+
+import orjson
+from pydantic import BaseModel
+
+from services.backend.cache import TtlLruCache
+
+Rendered = Tuple[Any, Dict[str, str]]
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers")
+
+    def __init__(self, body: bytes, headers: Dict[str, str]):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.headers = headers
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError
+
+
+class ResponseCache:
+    """Response bodies already encoded to JSON bytes, with their ETags.
+
+    ``version`` is the data version: every change notification bumps it and
+    empties the cache, and a body rendered while it changed is not stored.
+    ``render`` has to read the primary with a query started after it was
+    called, so the body is at least as fresh as the version it is stored
+    under.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.version = 0
+        self.cache: TtlLruCache[CachedResponse] = TtlLruCache(max_size, ttl)
+
+    def invalidate(self, payload: Union[str, None] = None):
+        self.version += 1
+        self.cache.clear()
+
+    async def get(
+        self, key: Hashable, render: Callable[[], Awaitable[Rendered]]
+    ) -> CachedResponse:
+        """The cached response for ``key``, rendered and stored on a miss.
+
+        ``render`` returns the content and extra headers of the response.
+        """
+        response = self.cache.get(key)
+        if response is None:
+            version = self.version
+            content, headers = await render()
+            response = CachedResponse(orjson.dumps(content, default=_default), headers)
+            if version == self.version:
+                self.cache.set(key, response)
+        return response
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "version": self.version}
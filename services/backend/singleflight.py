@@ -0,0 +1,77 @@
+import asyncio
+import functools
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs one call per key at a time, concurrent callers share its result.
+
+    The call runs in its own task, so a caller that gets cancelled (say, the
+    client went away) does not cancel it for the others still waiting.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(call())
+            self._tasks[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(functools.partial(self._done, key))
+        else:
+            self.coalesced += 1
+            self._waiters[key] += 1
+            self.max_waiters = max(self.max_waiters, self._waiters[key])
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            del self._waiters[key]
+        if not task.cancelled():
+            # Marks the exception as retrieved when every caller has gone.
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._tasks),
+            "max_waiters": self.max_waiters,
+        }
+
+
+def _freeze(value) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(x) for x in value)
+    return value
+
+
+def coalesce(method):
+    """Coalesces concurrent calls of a module method made with equal arguments.
+
+    Calls with ``fresh=True`` always run on their own: a call already in
+    flight may have started before a change the caller must see.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if kwargs.get("fresh"):
+            return await method(self, *args, **kwargs)
+        key = (
+            method.__name__,
+            _freeze(args),
+            tuple(sorted((name, _freeze(x)) for name, x in kwargs.items())),
+        )
+        return await self.single_flight.do(key, lambda: method(self, *args, **kwargs))
+
+    return wrapper
@@ -1,7 +1,16 @@
 from typing import Set
 
 from geoalchemy2 import Geography
-from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy import (
+    JSON,
+    Computed,
+    Double,
+    ForeignKey,
+    Integer,
+    String,
+    column,
+    table,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -20,6 +29,7 @@ class Organization(Base):
         secondary="organization_category", back_populates="organizations"
     )
     address: Mapped["Address"] = relationship(back_populates="organizations")
+    phones: Mapped[Set["PhoneNumber"]] = relationship(back_populates="organization")
 
 
 class PhoneNumber(Base):
@@ -30,6 +40,8 @@ class PhoneNumber(Base):
         Integer, ForeignKey("organization.id"), nullable=False
     )
 
+    organization: Mapped["Organization"] = relationship(back_populates="phones")
+
 
 class Address(Base):
     __tablename__ = "address"
@@ -42,6 +54,13 @@ class Address(Base):
     city: Mapped[str] = mapped_column(String)
     street: Mapped[str] = mapped_column(String)
     home: Mapped[str] = mapped_column(String)
+    # Generated from coordinates, so reads need no geography decoding.
+    lon: Mapped[float] = mapped_column(
+        Double, Computed("ST_X(coordinates::geometry)", persisted=True)
+    )
+    lat: Mapped[float] = mapped_column(
+        Double, Computed("ST_Y(coordinates::geometry)", persisted=True)
+    )
 
     organizations: Mapped[Set["Organization"]] = relationship(back_populates="address")
 
@@ -74,3 +93,7 @@ class ApiKey(Base):
 
     user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
     api_key: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+
+
+# Materialized view, created by a migration rather than from the metadata.
+org_document = table("org_document", column("id", Integer), column("doc", JSON))
@@ -1,22 +1,86 @@
+import asyncio
+from collections import defaultdict
 from contextlib import asynccontextmanager
 from functools import lru_cache
-from typing import AsyncIterator
+from typing import AsyncIterator, Callable, Dict, List, Sequence, Set, Union
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import asyncpg
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from services.app.logger import logger
+from services.app.metrics import TimedQueuePool, instrument_engine
 from services.app.settings import settings
+from services.db.replicas import Replica, read_modes
+
+
+def create_engine(url) -> AsyncEngine:
+    pool_size, max_overflow = settings.get_pool_limits()
+    engine = create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "timeout": settings.DB_CONNECT_TIMEOUT,
+            "command_timeout": settings.DB_COMMAND_TIMEOUT,
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        },
+    )
+    instrument_engine(engine)
+    return engine
 
 
 class Db:
-    def __init__(self, url):
-        self.engine = create_async_engine(
-            url, pool_size=50, max_overflow=100, pool_recycle=60 * 10
-        )
+    """Primary database plus optional read replicas.
+
+    ``read_session_scope`` picks a replica whose lag is within
+    ``DB_REPLICA_MAX_LAG``, round-robin or the one with the fewest open
+    sessions, and falls back to the primary when there is none. Lag is
+    checked on ``start`` and then every ``DB_REPLICA_CHECK_INTERVAL`` seconds.
+
+    Read sessions run in autocommit mode: every statement is its own
+    transaction, so there are no BEGIN and COMMIT round trips around it.
+    """
+
+    def __init__(self, url, replica_urls: Sequence[str] = ()):
+        self.url = make_url(url)
+        self.engine = create_engine(url)
         self.serializable_mode = self.engine.execution_options(
             isolation_level="SERIALIZABLE"
         )
+        self.autocommit_mode, self.read_only_mode = read_modes(self.engine)
         self.session_maker = async_sessionmaker(bind=self.engine, class_=AsyncSession)
+        self.listener: Union[asyncpg.Connection, None] = None
+        self.channels: Dict[str, List[Callable[[Union[str, None]], None]]] = (
+            defaultdict(list)
+        )
+        self.advisory_locks: Set[int] = set()
+        self.replicas = [
+            Replica(create_engine(replica_url), max_lag=settings.DB_REPLICA_MAX_LAG)
+            for replica_url in replica_urls
+        ]
+        self._replica_turn = 0
+        self._replica_monitor: Union[asyncio.Task, None] = None
+
+    async def start(self):
+        if self.replicas and self._replica_monitor is None:
+            await self.check_replicas()
+            self._replica_monitor = asyncio.get_running_loop().create_task(
+                self._monitor_replicas()
+            )
+
+    async def check_replicas(self):
+        await asyncio.gather(*(replica.check_lag() for replica in self.replicas))
 
     @asynccontextmanager
     async def session_scope(self) -> AsyncIterator[AsyncSession]:
@@ -44,8 +108,127 @@ class Db:
                 await session.close()
                 raise
 
+    @asynccontextmanager
+    async def read_session_scope(
+        self, transaction: bool = False, use_replica: bool = True
+    ) -> AsyncIterator[AsyncSession]:
+        """Session for queries that only read, nothing is committed.
+
+        By default statements autocommit one by one. With ``transaction`` they
+        share one READ ONLY transaction instead, for reads that depend on
+        transaction-local settings. Results cached until the next NOTIFY from
+        the primary should be read with ``use_replica=False``.
+        """
+        replica = self._pick_replica() if use_replica else None
+        target = self if replica is None else replica
+        bind = target.read_only_mode if transaction else target.autocommit_mode
+        if replica is not None:
+            replica.in_use += 1
+        try:
+            async with self.session_maker(bind=bind) as session:
+                try:
+                    yield session
+                except Exception as e:
+                    logger.exception(e)
+                    if replica is not None and (
+                        isinstance(e, OSError)
+                        or (isinstance(e, DBAPIError) and e.connection_invalidated)
+                    ):
+                        # Back to the primary until the next check succeeds.
+                        replica.lag = None
+                    raise
+        finally:
+            if replica is not None:
+                replica.in_use -= 1
+
+    async def listen(self, channel: str, callback: Callable[[Union[str, None]], None]):
+        """Calls ``callback`` with the payload of every NOTIFY sent to ``channel``.
+
+        Notifications go through one dedicated connection outside the pool.
+        When it is lost every callback is called with ``None``, since
+        notifications may have been missed, and the connection is re-established.
+        """
+        self.channels[channel].append(callback)
+        if self.listener is None:
+            await self._connect_listener()
+        elif len(self.channels[channel]) == 1:
+            await self.listener.add_listener(channel, self._notify)
+
+    async def try_advisory_lock(self, key: int) -> bool:
+        """Whether this process holds the session advisory lock ``key``.
+
+        The lock is taken on the notification connection, so only one
+        process holds it until that connection is closed or lost.
+        """
+        if key not in self.advisory_locks and self.listener is not None:
+            if await self.listener.fetchval("SELECT pg_try_advisory_lock($1)", key):
+                self.advisory_locks.add(key)
+        return key in self.advisory_locks
+
+    async def close(self):
+        if self._replica_monitor is not None:
+            self._replica_monitor.cancel()
+            self._replica_monitor = None
+        if self.listener is not None:
+            listener, self.listener = self.listener, None
+            listener.remove_termination_listener(self._on_listener_lost)
+            self.advisory_locks.clear()
+            await listener.close()
+        await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def _pick_replica(self) -> Union[Replica, None]:
+        available = [replica for replica in self.replicas if replica.available]
+        if not available:
+            return None
+        if settings.DB_REPLICA_SELECTION == "least_loaded":
+            return min(available, key=lambda replica: replica.in_use)
+        self._replica_turn += 1
+        return available[self._replica_turn % len(available)]
+
+    async def _monitor_replicas(self):
+        while True:
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+            await self.check_replicas()
+
+    async def _connect_listener(self):
+        dsn = self.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        listener = await asyncpg.connect(dsn)
+        for channel in self.channels:
+            await listener.add_listener(channel, self._notify)
+        listener.add_termination_listener(self._on_listener_lost)
+        self.listener = listener
+
+    def _notify(self, connection, pid, channel, payload):
+        for callback in self.channels[channel]:
+            callback(payload)
+
+    def _notify_all(self):
+        for callbacks in self.channels.values():
+            for callback in callbacks:
+                callback(None)
+
+    def _on_listener_lost(self, connection):
+        logger.warning("Notification listener connection lost, reconnecting.")
+        self.listener = None
+        self.advisory_locks.clear()
+        self._notify_all()
+        asyncio.get_running_loop().create_task(self._reconnect_listener())
+
+    async def _reconnect_listener(self):
+        while self.listener is None:
+            try:
+                await self._connect_listener()
+            except Exception as e:
+                logger.exception(e)
+                await asyncio.sleep(1)
+        self._notify_all()
+
 
 @lru_cache
 def get_db():
     url = settings.get_db_url()
-    return Db(url=url)
+    return Db(url=url, replica_urls=settings.get_replica_urls())
@@ -0,0 +1,66 @@
+from typing import Union
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from services.app.logger import logger
+
+# Seconds the replica is behind the primary, NULL while it is not streaming
+# from the primary: a disconnected replica has replayed all the WAL it
+# received and would look up to date. While streaming, a replica that replayed
+# all the WAL it received is up to date, however old its last replayed
+# transaction is. The receiver status is only visible to roles with
+# pg_read_all_stats, without it the replica is never used.
+REPLICATION_LAG = text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN NOT EXISTS ("
+    "SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'"
+    ") THEN NULL "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+def read_modes(engine: AsyncEngine):
+    """Autocommit and READ ONLY transaction variants of the engine, same pool."""
+    return (
+        engine.execution_options(isolation_level="AUTOCOMMIT"),
+        engine.execution_options(postgresql_readonly=True),
+    )
+
+
+class Replica:
+    """A read replica with its own pool, usable while its lag stays small.
+
+    ``lag`` is ``None`` until the first successful check and after a failed
+    one or while the replica is not streaming, so reads go to the primary
+    instead.
+    """
+
+    def __init__(self, engine: AsyncEngine, max_lag: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.autocommit_mode, self.read_only_mode = read_modes(engine)
+        self.lag: Union[float, None] = None
+        self.in_use = 0
+
+    @property
+    def available(self) -> bool:
+        return self.lag is not None and self.lag <= self.max_lag
+
+    async def check_lag(self):
+        try:
+            async with self.engine.connect() as conn:
+                res = await conn.execute(REPLICATION_LAG)
+                lag = res.scalar_one()
+        except Exception as e:
+            logger.warning(f"Replica {self.engine.url!r} is unavailable: {e!r}")
+            self.lag = None
+            return
+        if lag is None:
+            logger.warning(
+                f"Replica {self.engine.url!r} is not streaming from the primary"
+            )
+        self.lag = None if lag is None else float(lag)
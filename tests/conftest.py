@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from services.app.settings import settings
+from services.db import Db
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "postgres: needs the migrated PostgreSQL database from .env"
+    )
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """The database from ``.env``, the test is skipped when it is unreachable."""
+    db = Db(settings.get_db_url())
+    try:
+        async with db.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except (OSError, DBAPIError) as e:
+        await db.close()
+        pytest.skip(f"PostgreSQL is unreachable: {e!r}")
+    yield db
+    await db.close()
@@ -0,0 +1,74 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List
+
+
+class FakeResult:
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def all(self) -> list:
+        return self.rows
+
+    def scalar_one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeDb:
+    """Records the sessions and statements of a module, returns ``rows``.
+
+    While ``gate`` is set, statements wait for it, so calls can be caught in
+    flight. With ``error`` set, statements raise it.
+    """
+
+    def __init__(self, rows: list = ()):
+        self.rows = list(rows)
+        self.sessions: List[dict] = []
+        self.statements = []
+        self.gate: asyncio.Event = None
+        self.error: Exception = None
+
+    @asynccontextmanager
+    async def session_scope(self):
+        self.sessions.append({"transaction": True, "use_replica": False})
+        yield self
+
+    @asynccontextmanager
+    async def read_session_scope(
+        self, transaction: bool = False, use_replica: bool = True
+    ):
+        self.sessions.append({"transaction": transaction, "use_replica": use_replica})
+        yield self
+
+    async def execute(self, statement, *args):
+        self.statements.append(statement)
+        if self.error is not None:
+            raise self.error
+        if self.gate is not None:
+            await self.gate.wait()
+        return FakeResult(self.rows)
+
+
+class StubEngine:
+    """Engine whose connections answer every statement with ``value``."""
+
+    url = "stub"
+
+    def __init__(self, value=None, error: Exception = None):
+        self.value = value
+        self.error = error
+
+    def execution_options(self, **options) -> "StubEngine":
+        return self
+
+    @asynccontextmanager
+    async def connect(self):
+        if self.error is not None:
+            raise self.error
+        yield self
+
+    async def execute(self, statement):
+        return self
+
+    def scalar_one(self):
+        return self.value
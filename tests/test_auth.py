@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.app.settings import settings
+from services.backend.modules.auth.module import AuthModule
+from tests.fakes import FakeDb
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_unknown_keys_do_not_evict_valid_ones():
+    db = FakeDb(rows=[SimpleNamespace(user_id=1)])
+    auth = AuthModule(db)
+    assert (await auth.get_current_user("valid")).id == 1
+    db.rows = []
+    for i in range(settings.AUTH_CACHE_NEGATIVE_SIZE * 2):
+        assert await auth.get_current_user(f"guess {i}") is None
+    queries = len(db.statements)
+    assert (await auth.get_current_user("valid")).id == 1
+    assert len(db.statements) == queries
+    assert len(auth.negative_cache) == settings.AUTH_CACHE_NEGATIVE_SIZE
+
+
+async def test_unknown_key_is_cached_until_invalidated():
+    db = FakeDb()
+    auth = AuthModule(db)
+    assert await auth.get_current_user("unknown") is None
+    assert await auth.get_current_user("unknown") is None
+    assert len(db.statements) == 1
+    assert auth.cache_stats()["negative_hits"] == 1
+    auth.invalidate()
+    db.rows = [SimpleNamespace(user_id=2)]
+    assert (await auth.get_current_user("unknown")).id == 2
+
+
+async def test_key_revoked_during_lookup_is_not_cached():
+    db = FakeDb(rows=[SimpleNamespace(user_id=1)])
+    db.gate = asyncio.Event()
+    auth = AuthModule(db)
+    lookup = asyncio.ensure_future(auth.get_current_user("revoked"))
+    await asyncio.sleep(0)
+    auth.invalidate()
+    db.gate.set()
+    assert (await lookup).id == 1
+    db.gate, db.rows = None, []
+    assert await auth.get_current_user("revoked") is None
+    assert len(db.statements) == 2
@@ -0,0 +1,24 @@
+import pytest
+
+from services.backend.modules.organization.module import OrganizationModule
+from tests.fakes import FakeDb
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_documents_are_refreshed_only_after_a_change():
+    module = OrganizationModule(FakeDb())
+    assert module.documents_dirty
+    await module.refresh_documents()
+    assert not module.documents_dirty
+    module.invalidate_documents("")
+    assert module.documents_dirty
+
+
+async def test_failed_refresh_is_retried():
+    db = FakeDb()
+    db.error = OSError("connection reset")
+    module = OrganizationModule(db)
+    with pytest.raises(OSError):
+        await module.refresh_documents()
+    assert module.documents_dirty
@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from services.backend.modules.organization.geodesic import area_envelope, project
+
+NORTH, EAST, SOUTH, WEST = 0, math.pi / 2, math.pi, 3 * math.pi / 2
+# Meters of one degree of latitude from the equator and of longitude along it.
+DEGREE_OF_LATITUDE = 110574.39
+DEGREE_OF_LONGITUDE = 111319.49
+# Meridian arc from 89 degrees of latitude to the pole.
+LAST_DEGREE_OF_LATITUDE = 111693.86
+# Meters per radian of latitude at the pole.
+POLAR_RADIUS_OF_CURVATURE = 6399593.63
+
+CASES = [
+    # lon, lat, meters, azimuth, expected lon, expected lat
+    (0, 0, DEGREE_OF_LATITUDE, NORTH, 0, 1),
+    (0, 0, DEGREE_OF_LATITUDE, SOUTH, 0, -1),
+    (0, 0, DEGREE_OF_LONGITUDE, EAST, 1, 0),
+    (0, 0, DEGREE_OF_LONGITUDE, WEST, -1, 0),
+    (37.5, 0, 0, EAST, 37.5, 0),
+    # Across the antimeridian, both ways.
+    (179.5, 0, DEGREE_OF_LONGITUDE, EAST, -179.5, 0),
+    (-179.5, 0, DEGREE_OF_LONGITUDE, WEST, 179.5, 0),
+    # To the pole, and over it onto the opposite meridian.
+    (0, 89, LAST_DEGREE_OF_LATITUDE, NORTH, 0, 90),
+    (
+        10,
+        89,
+        LAST_DEGREE_OF_LATITUDE + 1000,
+        NORTH,
+        -170,
+        90 - math.degrees(1000 / POLAR_RADIUS_OF_CURVATURE),
+    ),
+    (
+        -10,
+        -89,
+        LAST_DEGREE_OF_LATITUDE + 1000,
+        SOUTH,
+        170,
+        -90 + math.degrees(1000 / POLAR_RADIUS_OF_CURVATURE),
+    ),
+]
+
+
+@pytest.mark.parametrize("lon, lat, meters, azimuth, lon2, lat2", CASES)
+def test_project_known_points(lon, lat, meters, azimuth, lon2, lat2):
+    lons, lats = project([lon], [lat], [meters], [azimuth])
+    assert lats[0] == pytest.approx(lat2, abs=1e-7)
+    if abs(lat2) < 90:
+        assert lons[0] == pytest.approx(lon2, abs=1e-7)
+
+
+def test_project_is_vectorized():
+    lons, lats = project(*zip(*(case[:4] for case in CASES)))
+    for (lon, lat, meters, azimuth, *_), lon2, lat2 in zip(CASES, lons, lats):
+        single_lons, single_lats = project([lon], [lat], [meters], [azimuth])
+        assert (single_lons[0], single_lats[0]) == (lon2, lat2)
+
+
+def test_area_envelope_is_centered():
+    west, south, east, north = area_envelope(
+        0, 0, 2 * DEGREE_OF_LATITUDE, 2 * DEGREE_OF_LONGITUDE
+    )
+    assert (west, south) == pytest.approx((-east, -north), abs=1e-12)
+    # The edges leave the corners of 1 degree along geodesics, not parallels.
+    assert east == pytest.approx(1, abs=1e-3)
+    assert north == pytest.approx(1, abs=1e-3)
+
+
+@pytest.mark.anyio
+@pytest.mark.postgres
+async def test_project_matches_st_project(db):
+    rng = np.random.default_rng(0)
+    cases = [case[:4] for case in CASES] + list(
+        zip(
+            rng.uniform(-180, 180, 50),
+            rng.uniform(-89.9, 89.9, 50),
+            rng.uniform(0, 50_000, 50),
+            rng.uniform(0, 2 * math.pi, 50),
+        )
+    )
+    lons, lats = project(*zip(*cases))
+    async with db.session_scope() as sess:
+        for (lon, lat, meters, azimuth), lon2, lat2 in zip(cases, lons, lats):
+            res = await sess.execute(
+                text(
+                    "SELECT ST_X(p::geometry), ST_Y(p::geometry) FROM ST_Project("
+                    "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography, "
+                    ":meters, :azimuth) AS p"
+                ),
+                {
+                    "lon": float(lon),
+                    "lat": float(lat),
+                    "meters": float(meters),
+                    "azimuth": float(azimuth),
+                },
+            )
+            expected_lon, expected_lat = res.one()
+            assert lat2 == pytest.approx(expected_lat, abs=1e-9)
+            if abs(expected_lat) < 90:
+                assert lon2 == pytest.approx(expected_lon, abs=1e-9)
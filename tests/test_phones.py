@@ -0,0 +1,62 @@
+from collections import defaultdict
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from benchmarks.common import count_round_trips
+from services.backend.modules.organization.module import OrganizationModule
+from services.db.models import Organization, PhoneNumber
+from tests.fakes import FakeDb
+
+pytestmark = pytest.mark.anyio
+
+
+def org_row(org_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=org_id,
+        name=f"org {org_id}",
+        lat=55.75,
+        lon=37.62,
+        country="Russia",
+        city="Moscow",
+        street="Tverskaya",
+        home="1",
+        phones=[f"+7-900-{org_id:07d}", f"+7-901-{org_id:07d}"],
+        categories=[],
+    )
+
+
+@pytest.mark.parametrize("size", [1, 10, 1000])
+async def test_phones_cost_no_query_per_organization(size):
+    org_ids = list(range(1, size + 1))
+    db = FakeDb(rows=[org_row(org_id) for org_id in org_ids])
+    orgs = await OrganizationModule(db).get_by_ids(org_ids=org_ids)
+    assert len(db.statements) == 1
+    assert [org.phones for org in orgs] == [org_row(x).phones for x in org_ids]
+
+
+def test_phones_are_selected_with_organizations():
+    query = OrganizationModule._select_orgs(Organization.id == 1)
+    assert "phones" in query.selected_columns
+    assert "phone_number" in str(query)
+
+
+@pytest.mark.postgres
+async def test_phones_round_trips_do_not_grow_with_results(db):
+    module = OrganizationModule(db)
+    async with db.session_scope() as sess:
+        res = await sess.execute(select(PhoneNumber.org_id, PhoneNumber.number))
+        stored = defaultdict(set)
+        for org_id, number in res.all():
+            stored[org_id].add(number)
+        res = await sess.execute(select(Organization.id).order_by(Organization.id))
+        org_ids = res.scalars().all()
+    round_trips = set()
+    for size in (1, len(org_ids)):
+        with count_round_trips(db.engine) as counter:
+            orgs = await module.get_by_ids(org_ids=org_ids[:size])
+        round_trips.add(counter.count)
+        for org in orgs:
+            assert set(org.phones) == stored[org.id]
+    assert len(round_trips) == 1
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from services.backend.modules.organization.module import OrganizationModule
+from services.backend.response_cache import ResponseCache
+from tests.fakes import FakeDb
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_fresh_reads_the_primary():
+    db = FakeDb()
+    module = OrganizationModule(db)
+    await module.get_by_id(org_id=1, fresh=True)
+    await module.get_by_categories(cat_ids=[1], fresh=True)
+    await module.get_by_id(org_id=1)
+    assert [x["use_replica"] for x in db.sessions] == [False, False, True]
+
+
+async def test_fresh_does_not_join_a_call_in_flight():
+    db = FakeDb()
+    db.gate = asyncio.Event()
+    module = OrganizationModule(db)
+    stale = asyncio.ensure_future(module.get_by_id(org_id=1))
+    await asyncio.sleep(0)
+    fresh = asyncio.ensure_future(module.get_by_id(org_id=1, fresh=True))
+    await asyncio.sleep(0)
+    db.gate.set()
+    await asyncio.gather(stale, fresh)
+    assert len(db.statements) == 2
+    assert module.single_flight.coalesced == 0
+
+
+async def test_body_rendered_across_invalidation_is_not_stored():
+    cache = ResponseCache(max_size=10, ttl=60)
+
+    async def render():
+        cache.invalidate()
+        return {"id": 1}, {}
+
+    response = await cache.get("key", render)
+    assert response.body == b'{"id":1}'
+    assert cache.cache.get("key") is None
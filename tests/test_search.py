@@ -0,0 +1,35 @@
+import pytest
+
+from benchmarks.endpoints import call_app
+from services.app.api.v1.authentication import check_api_key
+from services.app.main import app
+from services.backend import get_backend
+from services.backend.modules.auth.schemas import User
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def no_backend():
+    """Requests rejected before any search are answered without a database."""
+    app.dependency_overrides[check_api_key] = lambda: User(id=1)
+    app.dependency_overrides[get_backend] = lambda: None
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"lon": 37.6, "lat": 55.7},
+        {"lon": 37.6, "lat": 55.7, "name": "Bakery%"},
+        {"lon": 37.6, "cat_id": 1},
+        {"lat": 55.7, "name": "Bakery%"},
+        {"lon": 37.6, "lat": 55.7, "radius_meters": 100, "height": 100},
+        {"lon": 37.6, "radius_meters": 100},
+        {"lon": 37.6, "lat": 55.7, "height": 100},
+        {},
+    ],
+)
+async def test_incomplete_search_is_rejected(params):
+    assert await call_app("GET", "/org/search", params, b"") == 400
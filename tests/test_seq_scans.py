@@ -0,0 +1,16 @@
+import pytest
+
+from benchmarks.endpoints import DEFAULT_API_KEY
+from benchmarks.seq_scans import run
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+# Large enough for the planner to prefer indexes wherever they apply.
+ORGANIZATIONS = 100_000
+MIN_ROWS = 10_000
+
+
+async def test_routes_do_not_seq_scan_large_tables(db):
+    result = await run(ORGANIZATIONS, MIN_ROWS, DEFAULT_API_KEY)
+    assert result["statements"]
+    assert result["seq_scans"] == []
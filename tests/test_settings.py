@@ -0,0 +1,30 @@
+import pytest
+
+from services.app.settings import Settings
+
+
+def test_pool_limits_without_cap():
+    settings = Settings(DB_POOL_SIZE=10, DB_MAX_OVERFLOW=5, DB_MAX_CONNECTIONS=0)
+    assert settings.get_pool_limits() == (10, 5)
+
+
+@pytest.mark.parametrize(
+    "max_connections, limits",
+    [(100, (10, 5)), (24, (10, 1)), (8, (3, 0))],
+)
+def test_pool_limits_fit_the_cap(max_connections, limits):
+    settings = Settings(
+        SERVER_WORKERS=2,
+        DB_POOL_SIZE=10,
+        DB_MAX_OVERFLOW=5,
+        DB_MAX_CONNECTIONS=max_connections,
+    )
+    assert settings.get_pool_limits() == limits
+    pool_size, max_overflow = limits
+    assert 2 * (pool_size + max_overflow + 1) <= max_connections
+
+
+def test_pool_limits_reject_a_cap_below_two_connections_per_worker():
+    settings = Settings(SERVER_WORKERS=4, DB_MAX_CONNECTIONS=7)
+    with pytest.raises(ValueError):
+        settings.get_pool_limits()
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from benchmarks.common import cleanup_seed
+from benchmarks.seed import seed_dataset
+from benchmarks.spatial_index import check_parity, check_refresh, searches
+from services.backend.modules.organization.module import (
+    MAX_PREFILTER_CANDIDATES,
+    OrganizationModule,
+)
+from services.backend.modules.organization.spatial import (
+    MAX_REFRESH_POINTS,
+    PointEntries,
+    SpatialIndex,
+)
+from tests.fakes import FakeDb
+
+ORGANIZATIONS = 5_000
+
+
+def entries(points: dict) -> PointEntries:
+    """``{id: (lon, lat)}`` as entries."""
+    lons, lats = zip(*points.values()) if points else ((), ())
+    return PointEntries(
+        np.array(list(points), dtype=np.int64),
+        np.array(lons, dtype=np.float64),
+        np.array(lats, dtype=np.float64),
+    )
+
+
+def loaded(points: dict) -> SpatialIndex:
+    index = SpatialIndex()
+    index.take_pending()
+    index.replace(entries(points))
+    return index
+
+
+def test_within_includes_the_edges():
+    index = loaded({1: (10, 50), 2: (11, 51), 3: (12, 50.5), 4: (10.5, 52)})
+    assert sorted(index.within((10, 50, 11, 51)).ids) == [1, 2]
+    assert sorted(index.within((10, 49, 12, 53)).ids) == [1, 2, 3, 4]
+    assert not len(index.within((13, 50, 14, 51)).ids)
+
+
+def test_at_matches_both_coordinates():
+    index = loaded({1: (10, 50), 2: (10, 50), 3: (10, 50.0001), 4: (10.0001, 50)})
+    assert sorted(index.at(10, 50)) == [1, 2]
+
+
+def test_full_replace_sorts_by_latitude():
+    index = loaded({1: (0, 3), 2: (0, 1), 3: (0, 2)})
+    assert list(index.entries.lats) == [1, 2, 3]
+    assert list(index.entries.ids) == [2, 3, 1]
+    assert index.stats()["full_reloads"] == 1
+
+
+def test_replace_at_points_keeps_the_others():
+    index = loaded({1: (10, 50), 2: (11, 51), 3: (11, 51)})
+    index.replace(entries({3: (11, 51), 4: (12, 52)}), [(11, 51), (12, 52)])
+    assert sorted(index.entries.ids) == [1, 3, 4]
+    assert list(index.entries.lats) == sorted(index.entries.lats)
+    assert index.stats()["full_reloads"] == 1
+    assert index.stats()["refreshes"] == 2
+
+
+def test_take_pending():
+    index = SpatialIndex()
+    assert index.take_pending() is None
+    assert not index.dirty
+    index.invalidate([(1, 2), (1, 2), (3, 4)])
+    assert sorted(index.take_pending()) == [(1, 2), (3, 4)]
+    assert index.take_pending() == []
+    index.invalidate((i, 0) for i in range(MAX_REFRESH_POINTS + 1))
+    assert index.take_pending() is None
+    index.invalidate([(1, 2)])
+    index.invalidate()
+    index.invalidate([(3, 4)])
+    assert index.take_pending() is None
+
+
+def test_invalidate_payload():
+    index = SpatialIndex()
+    index.take_pending()
+    index.invalidate_payload(";1.5 2.25;;-3 4")
+    assert sorted(index.take_pending()) == [(-3, 4), (1.5, 2.25)]
+    index.invalidate_payload("")
+    assert index.take_pending() is None
+    index.invalidate_payload(None)
+    assert index.take_pending() is None
+
+
+@pytest.mark.anyio
+async def test_too_many_candidates_skip_the_prefilter():
+    db = FakeDb()
+    module = OrganizationModule(db)
+    module.spatial = loaded(
+        {i: (37.6 + i * 1e-6, 55.7) for i in range(MAX_PREFILTER_CANDIDATES + 1)}
+    )
+    search = OrganizationModule.get_by_radius.__wrapped__
+    await search(module, lon=37.6, lat=55.7, radius_meters=1)
+    await search(module, lon=37.6, lat=55.7, radius_meters=5_000)
+    narrowed, plain = (x.compile().params for x in db.statements)
+    assert len(narrowed["org_ids"]) < MAX_PREFILTER_CANDIDATES
+    assert "org_ids" not in plain
+
+
+@pytest.mark.anyio
+@pytest.mark.postgres
+async def test_index_matches_postgis(db):
+    await cleanup_seed(db)
+    try:
+        await seed_dataset(db, ORGANIZATIONS)
+        plain = OrganizationModule(db)
+        plain.spatial = None
+        indexed = OrganizationModule(db)
+        indexed.spatial = SpatialIndex()
+        await indexed.refresh_spatial_index()
+        assert await check_parity(indexed, plain, searches(ORGANIZATIONS, 20))
+        assert await check_refresh(db, indexed, plain, ORGANIZATIONS)
+    finally:
+        await cleanup_seed(db)